@@ -3,16 +3,53 @@ Westminster Footfall Analysis - Backend API Server
 Provides endpoints to run analysis and serve data to the frontend
 """
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import gzip
 import json
 import sys
 import os
+from dataclasses import dataclass
 from pathlib import Path
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from typing import Optional
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import threading
 import traceback
 import time
 
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import geobuf
+    HAS_GEOBUF = True
+except ImportError:
+    HAS_GEOBUF = False
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+GEOBUF_CONTENT_TYPE = 'application/x-protobuf'
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+# Independently versioned data held by AnalysisState
+DATA_LAYERS = ("tubes", "buses", "premises", "cells", "bins")
+
+# Frontend assets may be reused for an hour, then revalidated by ETag
+STATIC_CACHE_CONTROL = 'public, max-age=3600'
+
 # Add parent directory to path to import the analysis module
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -25,107 +62,252 @@ from westminster_footfall_analysis_simple import (
 )
 
 
+class _LockGuard:
+    """Context manager binding one side of a ReadWriteLock"""
+    def __init__(self, acquire, release):
+        self._acquire = acquire
+        self._release = release
+    
+    def __enter__(self):
+        self._acquire()
+        return self
+    
+    def __exit__(self, *exc):
+        self._release()
+        return False
+
+
+class ReadWriteLock:
+    """
+    Reader-writer lock: many concurrent readers or a single writer.
+    A waiting writer blocks new readers, so a steady stream of API reads
+    cannot starve the analysis thread. Use as `with lock.read:` or
+    `with lock.write:`.
+    """
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self.read = _LockGuard(self._acquire_read, self._release_read)
+        self.write = _LockGuard(self._acquire_write, self._release_write)
+    
+    def _acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+    
+    def _release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+    
+    def _acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+    
+    def _release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Consistent, read-only view of AnalysisState taken under one lock acquisition"""
+    tubes: Optional[list]
+    buses: Optional[list]
+    premises: Optional[list]
+    cells: Optional[list]
+    cell_arrays: Optional[dict]
+    cells_frame: Optional[pd.DataFrame]
+    bins: Optional[list]
+    bin_features: Optional[list]
+    category_distribution: Counter
+    sensor_distribution: Counter
+    status: str
+    progress: int
+    message: str
+    versions: dict
+    
+    def version(self, *layers):
+        """Data version of the given layers, as seen by this snapshot"""
+        return tuple(self.versions[layer] for layer in layers)
+
+
 class AnalysisState:
     """Holds the current state of the analysis - thread safe"""
     def __init__(self):
-        self.lock = threading.Lock()
+        self.lock = ReadWriteLock()
         self.config = Config()
         self._tubes = None
         self._buses = None
         self._premises = None
         self._cells = None
+        self._cell_arrays = None
+        self._cells_frame = None
         self._bins = None
+        self._bin_features = None
         self._selected_bins = None
+        # Histograms for /api/stats, counted once when cells/bins are stored
+        self._category_distribution = Counter()
+        self._sensor_distribution = Counter()
         self._status = "idle"
         self._progress = 0
         self._message = "Ready to run"
+        # Serialized responses, keyed by endpoint and tagged with the version
+        # of each data layer they were built from. A setter only bumps its
+        # own layer, so e.g. a new grid keeps the tube/bus/premises bytes.
+        self._versions = dict.fromkeys(DATA_LAYERS, 0)
+        self.running = threading.Event()
+        self._etag_prefix = f"{os.getpid():x}-{int(time.time()):x}"
+        self._response_cache = {}
     
     @property
     def tubes(self):
-        with self.lock:
+        with self.lock.read:
             return self._tubes
     
     @tubes.setter
     def tubes(self, value):
-        with self.lock:
+        with self.lock.write:
             self._tubes = value
+            self._versions["tubes"] += 1
     
     @property
     def buses(self):
-        with self.lock:
+        with self.lock.read:
             return self._buses
     
     @buses.setter
     def buses(self, value):
-        with self.lock:
+        with self.lock.write:
             self._buses = value
+            self._versions["buses"] += 1
     
     @property
     def premises(self):
-        with self.lock:
+        with self.lock.read:
             return self._premises
     
     @premises.setter
     def premises(self, value):
-        with self.lock:
+        with self.lock.write:
             self._premises = value
+            self._versions["premises"] += 1
     
     @property
     def cells(self):
-        with self.lock:
+        with self.lock.read:
             return self._cells
     
     @cells.setter
     def cells(self, value):
-        with self.lock:
+        arrays = build_cell_arrays(value, self.config) if value is not None else None
+        frame = build_cells_frame(value) if value is not None else None
+        categories = Counter(cell.footfall_category for cell in value or ())
+        with self.lock.write:
             self._cells = value
+            self._cell_arrays = arrays
+            self._cells_frame = frame
+            self._category_distribution = categories
+            self._versions["cells"] += 1
+    
+    @property
+    def cell_arrays(self):
+        """Struct-of-arrays view of the current cells (see build_cell_arrays)"""
+        with self.lock.read:
+            return self._cell_arrays
+    
+    @property
+    def cells_frame(self):
+        """DataFrame of the per-cell fields used by the summaries"""
+        with self.lock.read:
+            return self._cells_frame
     
     @property
     def bins(self):
-        with self.lock:
+        with self.lock.read:
             return self._bins
     
     @bins.setter
     def bins(self, value):
-        with self.lock:
+        features = build_bin_features(value) if value is not None else None
+        sensors = Counter(b.footfall_category for b in value or () if b.selected_for_sensor)
+        with self.lock.write:
             self._bins = value
+            self._bin_features = features
+            self._sensor_distribution = sensors
+            self._versions["bins"] += 1
+    
+    @property
+    def bin_features(self):
+        """Pre-built GeoJSON features for the current bins"""
+        with self.lock.read:
+            return self._bin_features
     
     @property
     def status(self):
-        with self.lock:
+        with self.lock.read:
             return self._status
     
     @status.setter
     def status(self, value):
-        with self.lock:
+        with self.lock.write:
             self._status = value
             print(f"[STATUS] {value}")
     
     @property
     def progress(self):
-        with self.lock:
+        with self.lock.read:
             return self._progress
     
     @progress.setter
     def progress(self, value):
-        with self.lock:
+        with self.lock.write:
             self._progress = value
             print(f"[PROGRESS] {value}%")
     
     @property
     def message(self):
-        with self.lock:
+        with self.lock.read:
             return self._message
     
     @message.setter
     def message(self, value):
-        with self.lock:
+        with self.lock.write:
             self._message = value
             print(f"[MESSAGE] {value}")
     
+    def snapshot(self):
+        """Read every field at once, for callers that need a coherent view"""
+        with self.lock.read:
+            return Snapshot(
+                tubes=self._tubes,
+                buses=self._buses,
+                premises=self._premises,
+                cells=self._cells,
+                cell_arrays=self._cell_arrays,
+                cells_frame=self._cells_frame,
+                bins=self._bins,
+                bin_features=self._bin_features,
+                category_distribution=self._category_distribution,
+                sensor_distribution=self._sensor_distribution,
+                status=self._status,
+                progress=self._progress,
+                message=self._message,
+                versions=dict(self._versions),
+            )
+    
     def get_state(self):
         """Get all state at once"""
-        with self.lock:
+        with self.lock.read:
             return {
                 "status": self._status,
                 "progress": self._progress,
@@ -134,18 +316,97 @@ class AnalysisState:
             }
     
     def reset(self):
-        with self.lock:
+        with self.lock.write:
             self._cells = None
+            self._cell_arrays = None
+            self._cells_frame = None
             self._bins = None
+            self._bin_features = None
             self._selected_bins = None
+            self._category_distribution = Counter()
+            self._sensor_distribution = Counter()
             self._status = "idle"
             self._progress = 0
             self._message = "Ready to run"
+            self._versions["cells"] += 1
+            self._versions["bins"] += 1
+            self._response_cache.clear()
+    
+    def begin_run(self):
+        """Claim the analysis slot; returns False if a run is already in progress"""
+        with self.lock.write:
+            if self.running.is_set():
+                return False
+            self.running.set()
+            return True
+    
+    def cached_response(self, key, version, build):
+        """
+        Return (etag, body) for a serialized response, rebuilding it only
+        when `version` (from the snapshot the body is built from) differs
+        from the one it was cached under.
+        """
+        with self.lock.read:
+            entry = self._response_cache.get(key)
+        if entry is None or entry[0] != version:
+            entry = (version, build())
+            with self.lock.write:
+                self._response_cache[key] = entry
+        tag = "-".join(str(v) for v in version)
+        return f'"{self._etag_prefix}-{tag}"', entry[1]
 
 
 state = AnalysisState()
 
 
+def _json_default(obj):
+    """Encode values the JSON backend does not handle natively (numpy arrays and scalars)"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(data) -> bytes:
+    """Serialize data to UTF-8 JSON bytes, using orjson when available"""
+    if HAS_ORJSON:
+        return orjson.dumps(
+            data,
+            default=_json_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(data, default=_json_default).encode()
+
+
+def dumps_feature_collection(features) -> bytes:
+    """
+    Serialize an iterable of features as a GeoJSON FeatureCollection.
+    Each feature is encoded as it is produced and only the byte fragments
+    are kept, so the full collection never exists as Python objects.
+    """
+    return b"".join((
+        b'{"type":"FeatureCollection","features":[',
+        b",".join(dumps_json(feature) for feature in features),
+        b"]}",
+    ))
+
+
+def encode_body(body, encoding):
+    """
+    Compress a response body for the wire.
+    Returns (body, applied_encoding); tiny bodies are sent as-is since the
+    framing overhead outweighs the saving.
+    """
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    if encoding == 'br':
+        return brotli.compress(body, quality=4), 'br'
+    # Level 1 is several times faster than the default for a similar ratio
+    # on repetitive GeoJSON
+    return gzip.compress(body, compresslevel=1), 'gzip'
+
+
 def tubes_to_geojson(tubes):
     """Convert tube stations to GeoJSON"""
     features = []
@@ -204,70 +465,147 @@ def premises_to_geojson(premises):
     return {"type": "FeatureCollection", "features": features}
 
 
-def cells_to_geojson(cells, config, score_type="footfall"):
-    """Convert grid cells to GeoJSON with specified score type"""
-    features = []
+def build_cell_arrays(cells, config):
+    """
+    Convert grid cells into a struct-of-arrays view.
+    
+    Holds the polygon ring of every cell as one (N, 5, 2) array, the raw
+    score columns for the highlight scores, a list of fully rounded
+    property dicts, one per cell, and each cell's feature pre-encoded up to
+    its highlight score. Built once per analysis so grid requests never
+    walk the Cell objects. The per-layer maxima used to normalise the
+    highlight score come from one column-wise reduction here rather than a
+    scan on every request.
+    """
+    n = len(cells)
+    numeric = np.array(
+        [(c.center_lon, c.center_lat, c.tube_score, c.bus_score, c.premises_score,
+          c.footfall_score, getattr(c, 'estimated_people_per_hour', 0),
+          getattr(c, 'estimated_bin_fill_rate', 0)) for c in cells],
+        dtype=np.float64
+    ).reshape(n, 8)
+    
+    properties = [
+        {
+            "cell_id": c.cell_id,
+            "footfall_score": footfall,
+            "tube_score": tube,
+            "bus_score": bus,
+            "premises_score": premises,
+            "footfall_category": c.footfall_category,
+            "footfall_category_name": c.footfall_category_name,
+            "ward": getattr(c, 'ward', ''),
+            "road_name": getattr(c, 'road_name', ''),
+            "estimated_people_per_hour": people,
+            "estimated_bin_fill_rate": fill_rate
+        }
+        for c, footfall, tube, bus, premises, people, fill_rate in zip(
+            cells,
+            np.round(numeric[:, 5], 4).tolist(),
+            np.round(numeric[:, 2], 2).tolist(),
+            np.round(numeric[:, 3], 2).tolist(),
+            np.round(numeric[:, 4], 2).tolist(),
+            np.round(numeric[:, 6], 0).tolist(),
+            np.round(numeric[:, 7], 1).tolist()
+        )
+    ]
+    
+    maxima = numeric[:, 2:6].max(axis=0).tolist() if n else [0.0] * 4
+    
+    # Square ring around each centre, closed back on its first corner
     half_size = config.GRID_RESOLUTION / 2
+    offsets = np.array([
+        [-half_size, -half_size],
+        [half_size, -half_size],
+        [half_size, half_size],
+        [-half_size, half_size],
+        [-half_size, -half_size],
+    ])
+    rings = np.ascontiguousarray(numeric[:, None, 0:2] + offsets)
     
-    # Find max scores for normalization
-    max_scores = {"tube": 0, "bus": 0, "premises": 0, "footfall": 0}
-    for cell in cells:
-        max_scores["tube"] = max(max_scores["tube"], cell.tube_score)
-        max_scores["bus"] = max(max_scores["bus"], cell.bus_score)
-        max_scores["premises"] = max(max_scores["premises"], cell.premises_score)
-        max_scores["footfall"] = max(max_scores["footfall"], cell.footfall_score)
-    
-    for cell in cells:
-        coords = [
-            [cell.center_lon - half_size, cell.center_lat - half_size],
-            [cell.center_lon + half_size, cell.center_lat - half_size],
-            [cell.center_lon + half_size, cell.center_lat + half_size],
-            [cell.center_lon - half_size, cell.center_lat + half_size],
-            [cell.center_lon - half_size, cell.center_lat - half_size],
-        ]
-        
-        # Determine which score to highlight
-        if score_type == "tube":
-            highlight_score = cell.tube_score / max_scores["tube"] if max_scores["tube"] > 0 else 0
-        elif score_type == "bus":
-            highlight_score = cell.bus_score / max_scores["bus"] if max_scores["bus"] > 0 else 0
-        elif score_type == "premises":
-            highlight_score = cell.premises_score / max_scores["premises"] if max_scores["premises"] > 0 else 0
-        else:
-            highlight_score = cell.footfall_score
-        
-        features.append({
+    # Everything in a cell's feature except the highlight score is the same
+    # for all four grid layers: encode it once, member by member, leaving
+    # the properties object open on a "highlight_score" key so requests
+    # only append the score and the closing braces
+    feature_heads = [
+        b'{"type":"Feature","geometry":'
+        + dumps_json({"type": "Polygon", "coordinates": [ring]})
+        + b',"properties":{'
+        + b"".join([dumps_json(key) + b":" + dumps_json(value) + b"," for key, value in props.items()])
+        + b'"highlight_score":'
+        for ring, props in zip(rings, properties)
+    ]
+    
+    return {
+        "rings": rings,
+        "tube_score": numeric[:, 2].copy(),
+        "bus_score": numeric[:, 3].copy(),
+        "premises_score": numeric[:, 4].copy(),
+        "footfall_score": numeric[:, 5].copy(),
+        "properties": properties,
+        "feature_heads": feature_heads,
+        "max_score": dict(zip(("tube", "bus", "premises", "footfall"), maxima)),
+    }
+
+
+def highlight_scores(cell_arrays, score_type="footfall"):
+    """Rounded per-cell highlight score: raw footfall, or a layer scaled to its max"""
+    if score_type in ("tube", "bus", "premises"):
+        raw = cell_arrays[f"{score_type}_score"]
+        max_score = cell_arrays["max_score"][score_type]
+        highlight = raw / max_score if max_score > 0 else np.zeros_like(raw)
+    else:
+        highlight = cell_arrays["footfall_score"]
+    return np.round(highlight, 4)
+
+
+def cell_features_json(cell_arrays, score_type="footfall") -> bytes:
+    """
+    Encode the grid FeatureCollection for one score type.
+    Appends each encoded highlight score to its pre-encoded feature head,
+    so no per-feature dicts are built.
+    """
+    heads = cell_arrays["feature_heads"]
+    scores = [dumps_json(score) for score in highlight_scores(cell_arrays, score_type).tolist()]
+    return b"".join((
+        b'{"type":"FeatureCollection","features":[',
+        b",".join([head + score + b"}}" for head, score in zip(heads, scores)]),
+        b"]}",
+    ))
+
+
+def iter_cell_features(cell_arrays, score_type="footfall"):
+    """
+    Yield the GeoJSON feature for each grid cell with the specified score type.
+    Rings are (5, 2) views into the precomputed array; orjson encodes them
+    straight from NumPy memory.
+    """
+    rings = cell_arrays["rings"]
+    highlight = highlight_scores(cell_arrays, score_type).tolist()
+    
+    for ring, props, hl in zip(rings, cell_arrays["properties"], highlight):
+        yield {
             "type": "Feature",
             "geometry": {
                 "type": "Polygon",
-                "coordinates": [coords]
+                "coordinates": [ring]
             },
-            "properties": {
-                "cell_id": cell.cell_id,
-                "footfall_score": round(cell.footfall_score, 4),
-                "tube_score": round(cell.tube_score, 2),
-                "bus_score": round(cell.bus_score, 2),
-                "premises_score": round(cell.premises_score, 2),
-                "footfall_category": cell.footfall_category,
-                "footfall_category_name": cell.footfall_category_name,
-                "highlight_score": round(highlight_score, 4),
-                "ward": getattr(cell, 'ward', ''),
-                "road_name": getattr(cell, 'road_name', ''),
-                "estimated_people_per_hour": round(getattr(cell, 'estimated_people_per_hour', 0), 0),
-                "estimated_bin_fill_rate": round(getattr(cell, 'estimated_bin_fill_rate', 0), 1)
-            }
-        })
-    
-    return {"type": "FeatureCollection", "features": features}
+            "properties": {**props, "highlight_score": hl}
+        }
 
 
-def bins_to_geojson(bins, selected_only=False):
-    """Convert bins to GeoJSON"""
-    features = []
-    for b in bins:
-        if selected_only and not b.selected_for_sensor:
-            continue
-        features.append({
+def cells_to_geojson(cell_arrays, score_type="footfall"):
+    """Convert grid cell arrays to GeoJSON with specified score type"""
+    return {
+        "type": "FeatureCollection",
+        "features": list(iter_cell_features(cell_arrays, score_type))
+    }
+
+
+def build_bin_features(bins):
+    """Build the GeoJSON feature for every bin once, after sensor selection"""
+    return [
+        {
             "type": "Feature",
             "geometry": {
                 "type": "Point",
@@ -286,13 +624,34 @@ def bins_to_geojson(bins, selected_only=False):
                 "estimated_people_per_hour": round(getattr(b, 'estimated_people_per_hour', 0), 0),
                 "estimated_bin_fill_rate": round(getattr(b, 'estimated_bin_fill_rate', 0), 1)
             }
-        })
-    return {"type": "FeatureCollection", "features": features}
+        }
+        for b in bins
+    ]
+
+
+def iter_bin_features(bin_features, selected_only=False):
+    """Yield the pre-built bin features, optionally only those selected for sensors"""
+    if not selected_only:
+        return iter(bin_features)
+    return (f for f in bin_features if f["properties"]["selected_for_sensor"])
+
+
+def bins_to_geojson(bin_features, selected_only=False):
+    """Convert pre-built bin features to GeoJSON"""
+    return {"type": "FeatureCollection", "features": list(iter_bin_features(bin_features, selected_only))}
 
 
 class APIHandler(SimpleHTTPRequestHandler):
     """HTTP request handler with API endpoints"""
     
+    # Every response carries a Content-Length, so connections can be kept
+    # alive. A kept-alive connection holds its worker slot while idle, so
+    # idle ones are dropped after `timeout` seconds: long enough to reuse the
+    # socket across a page load's burst of requests, short enough that idle
+    # tabs can't starve the max_workers slots
+    protocol_version = 'HTTP/1.1'
+    timeout = 2
+    
     def __init__(self, *args, **kwargs):
         # Set directory to serve static files from frontend
         self.directory = str(Path(__file__).parent.parent / "frontend")
@@ -303,14 +662,155 @@ class APIHandler(SimpleHTTPRequestHandler):
         if '/api/' in str(args[0]):
             print(f"[API] {args[0]}")
     
+    def send_head(self):
+        """
+        Serve frontend files with an ETag and a one hour public cache
+        lifetime, answering a matching If-None-Match with a 304.
+        """
+        self._static_etag = None
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split('?', 1)[0].endswith('/'):
+            path = os.path.join(path, 'index.html')
+        if os.path.isfile(path):
+            st = os.stat(path)
+            etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', STATIC_CACHE_CONTROL)
+                self.end_headers()
+                return None
+            self._static_etag = etag
+        return super().send_head()
+    
+    def end_headers(self):
+        etag = getattr(self, '_static_etag', None)
+        if etag:
+            self._static_etag = None
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', STATIC_CACHE_CONTROL)
+        super().end_headers()
+    
+    def copyfile(self, source, outputfile):
+        """
+        Copy a static file to the client with socket.sendfile, which uses
+        os.sendfile (no userspace copy) where the platform supports it and
+        falls back to plain reads and writes otherwise.
+        """
+        if outputfile is not self.wfile:
+            super().copyfile(source, outputfile)
+            return
+        self.wfile.flush()
+        self.connection.sendfile(source)
+    
     def send_json(self, data, status=200):
         """Send JSON response"""
+        body, encoding = encode_body(dumps_json(data), self.accepted_encoding())
+        self.send_body(body, status, content_encoding=encoding, vary='Accept-Encoding')
+    
+    def send_body(self, body, status=200, etag=None,
+                  content_type='application/json', content_encoding=None, vary=None):
+        """Send a pre-encoded response body"""
         self.send_response(status)
-        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+        if content_encoding:
+            self.send_header('Content-Encoding', content_encoding)
+        if vary:
+            self.send_header('Vary', vary)
+        if etag:
+            # Allow the browser to keep the payload but revalidate every time
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        else:
+            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
+    
+    def accepted_encoding(self):
+        """Pick the best Content-Encoding the client advertises, or None"""
+        accepted = set()
+        for part in self.headers.get('Accept-Encoding', '').split(','):
+            token, _, params = part.partition(';')
+            if params.strip().replace(' ', '') not in ('q=0', 'q=0.0'):
+                accepted.add(token.strip().lower())
+        if HAS_BROTLI and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+    
+    def send_cached_json(self, key, version, build):
+        """
+        Send a response that only changes when the analysis data changes.
+        The encoded bytes are reused across requests, and clients presenting
+        a matching If-None-Match get a 304 without a body.
+        """
+        self.send_cached(key, version, lambda: dumps_json(build()))
+    
+    def send_cached(self, key, version, build, content_type='application/json',
+                    variant=None, vary='Accept-Encoding'):
+        """
+        Send a cached body, compressed once per data version and encoding.
+        Each representation gets its own ETag so a gzip copy is never
+        revalidated against a br or identity one.
+        """
+        encoding = self.accepted_encoding()
+        etag, (body, applied) = state.cached_response(
+            f'{key}:{variant}:{encoding}', version, lambda: encode_body(build(), encoding)
+        )
+        suffix = '-'.join(part for part in (variant, applied) if part)
+        if suffix:
+            etag = f'{etag[:-1]}-{suffix}"'
+        if self.not_modified(etag, vary):
+            return
+        self.send_body(
+            body, etag=etag, content_type=content_type,
+            content_encoding=applied, vary=vary,
+        )
+    
+    def not_modified(self, etag, vary=None):
+        """Send a 304 if the client already holds this representation"""
+        if self.headers.get('If-None-Match') != etag:
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-cache')
+        if vary:
+            self.send_header('Vary', vary)
+        self.end_headers()
+        return True
+    
+    def wants_geobuf(self, path):
+        """True for the .pbf routes or when the client asks for protobuf"""
+        return path.endswith('.pbf') or GEOBUF_CONTENT_TYPE in self.headers.get('Accept', '')
+    
+    def send_cached_features(self, key, version, features, path, encode_json=None):
+        """
+        Send a cached FeatureCollection, as Geobuf when the client negotiates
+        it and GeoJSON otherwise. `features` returns an iterator of features;
+        the GeoJSON body is assembled from per-feature fragments unless
+        `encode_json` provides the encoded collection directly.
+        """
+        # Without Geobuf nothing is negotiated on Accept; with it, both
+        # representations of a non-.pbf route must say they vary on it
+        negotiated = HAS_GEOBUF and not path.endswith('.pbf')
+        vary = 'Accept, Accept-Encoding' if negotiated else 'Accept-Encoding'
+        if not self.wants_geobuf(path) or not HAS_GEOBUF:
+            if path.endswith('.pbf'):
+                self.send_json({"error": "Geobuf encoding not available (pip install geobuf)"}, 501)
+                return
+            self.send_cached(
+                key, version, encode_json or (lambda: dumps_feature_collection(features())), vary=vary
+            )
+            return
+        
+        self.send_cached(
+            key, version, lambda: geobuf.encode({"type": "FeatureCollection", "features": list(features())}),
+            content_type=GEOBUF_CONTENT_TYPE, variant='pbf', vary=vary,
+        )
     
     def do_OPTIONS(self):
         """Handle CORS preflight"""
@@ -318,6 +818,7 @@ class APIHandler(SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
     def do_GET(self):
@@ -325,6 +826,7 @@ class APIHandler(SimpleHTTPRequestHandler):
         parsed = urlparse(self.path)
         path = parsed.path
         params = parse_qs(parsed.query)
+        snap = state.snapshot()
         
         try:
             # API Routes
@@ -333,92 +835,133 @@ class APIHandler(SimpleHTTPRequestHandler):
                 return
                 
             elif path == '/api/tubes':
-                tubes = state.tubes
+                tubes = snap.tubes
+                version = snap.version('tubes')
                 if tubes is None:
-                    state.tubes = load_tube_stations()
-                    tubes = state.tubes
-                self.send_json(tubes_to_geojson(tubes))
+                    # Storing the layer bumps its version; cache under the new one
+                    tubes = load_tube_stations()
+                    state.tubes = tubes
+                    version = state.snapshot().version('tubes')
+                self.send_cached_json(
+                    'tubes', version, lambda: tubes_to_geojson(tubes)
+                )
                 return
                 
             elif path == '/api/buses':
-                buses = state.buses
+                buses = snap.buses
+                version = snap.version('buses')
                 if buses is None:
-                    state.buses = load_bus_stops(state.config)
-                    buses = state.buses
-                self.send_json(buses_to_geojson(buses))
+                    # Storing the layer bumps its version; cache under the new one
+                    buses = load_bus_stops(state.config)
+                    state.buses = buses
+                    version = state.snapshot().version('buses')
+                self.send_cached_json(
+                    'buses', version, lambda: buses_to_geojson(buses)
+                )
                 return
                 
             elif path == '/api/premises':
-                premises = state.premises
+                premises = snap.premises
+                version = snap.version('premises')
                 if premises is None:
-                    state.premises = load_licensed_premises()
-                    premises = state.premises
-                self.send_json(premises_to_geojson(premises))
+                    # Storing the layer bumps its version; cache under the new one
+                    premises = load_licensed_premises()
+                    state.premises = premises
+                    version = state.snapshot().version('premises')
+                self.send_cached_json(
+                    'premises', version, lambda: premises_to_geojson(premises)
+                )
                 return
                 
-            elif path == '/api/grid':
-                cells = state.cells
-                if cells is None:
+            elif path in ('/api/grid', '/api/grid.pbf'):
+                cell_arrays = snap.cell_arrays
+                if cell_arrays is None:
                     self.send_json({"error": "Run analysis first"}, 400)
                     return
-                self.send_json(cells_to_geojson(cells, state.config, "footfall"))
+                self.send_cached_features(
+                    'grid:footfall', snap.version('cells'),
+                    lambda: iter_cell_features(cell_arrays, "footfall"), path,
+                    encode_json=lambda: cell_features_json(cell_arrays, "footfall")
+                )
                 return
                     
             elif path == '/api/grid/tube':
-                cells = state.cells
-                if cells is None:
+                cell_arrays = snap.cell_arrays
+                if cell_arrays is None:
                     self.send_json({"error": "Run analysis first"}, 400)
                     return
-                self.send_json(cells_to_geojson(cells, state.config, "tube"))
+                self.send_cached_features(
+                    'grid:tube', snap.version('cells'),
+                    lambda: iter_cell_features(cell_arrays, "tube"), path,
+                    encode_json=lambda: cell_features_json(cell_arrays, "tube")
+                )
                 return
                     
             elif path == '/api/grid/bus':
-                cells = state.cells
-                if cells is None:
+                cell_arrays = snap.cell_arrays
+                if cell_arrays is None:
                     self.send_json({"error": "Run analysis first"}, 400)
                     return
-                self.send_json(cells_to_geojson(cells, state.config, "bus"))
+                self.send_cached_features(
+                    'grid:bus', snap.version('cells'),
+                    lambda: iter_cell_features(cell_arrays, "bus"), path,
+                    encode_json=lambda: cell_features_json(cell_arrays, "bus")
+                )
                 return
                     
             elif path == '/api/grid/premises':
-                cells = state.cells
-                if cells is None:
+                cell_arrays = snap.cell_arrays
+                if cell_arrays is None:
                     self.send_json({"error": "Run analysis first"}, 400)
                     return
-                self.send_json(cells_to_geojson(cells, state.config, "premises"))
+                self.send_cached_features(
+                    'grid:premises', snap.version('cells'),
+                    lambda: iter_cell_features(cell_arrays, "premises"), path,
+                    encode_json=lambda: cell_features_json(cell_arrays, "premises")
+                )
                 return
             
-            elif path == '/api/bins':
-                bins = state.bins
-                if bins is None:
+            elif path in ('/api/bins', '/api/bins.pbf'):
+                bin_features = snap.bin_features
+                if bin_features is None:
                     self.send_json({"error": "No bins loaded"}, 400)
                     return
                 selected_only = params.get('selected', ['false'])[0] == 'true'
-                self.send_json(bins_to_geojson(bins, selected_only))
+                self.send_cached_features(
+                    f'bins:{selected_only}', snap.version('bins'),
+                    lambda: iter_bin_features(bin_features, selected_only), path
+                )
                 return
                     
             elif path == '/api/selected-bins':
-                bins = state.bins
-                if bins is None:
+                bin_features = snap.bin_features
+                if bin_features is None:
                     self.send_json({"error": "No bins loaded"}, 400)
                     return
-                self.send_json(bins_to_geojson(bins, selected_only=True))
+                self.send_cached_features(
+                    'bins:True', snap.version('bins'),
+                    lambda: iter_bin_features(bin_features, selected_only=True), path
+                )
                 return
                     
             elif path == '/api/stats':
-                self.send_json(get_analysis_stats())
+                self.send_json(get_analysis_stats(snap))
                 return
             
             elif path == '/api/summary/wards':
-                self.send_json(get_ward_summary())
+                self.send_cached_json(
+                    'summary:wards', snap.version('cells', 'bins'), lambda: get_ward_summary(snap)
+                )
                 return
             
             elif path == '/api/summary/sensors':
-                self.send_json(get_sensor_summary())
+                self.send_cached_json(
+                    'summary:sensors', snap.version('bins'), lambda: get_sensor_summary(snap)
+                )
                 return
                 
             elif path == '/api/run-analysis':
-                if state.status == "running":
+                if not state.begin_run():
                     self.send_json({"status": "already_running", "message": "Analysis already in progress"})
                     return
                     
@@ -434,6 +977,8 @@ class APIHandler(SimpleHTTPRequestHandler):
         except Exception as e:
             print(f"[ERROR] {path}: {e}")
             traceback.print_exc()
+            # A partial response may already be on the wire
+            self.close_connection = True
             self.send_json({"error": str(e)}, 500)
     
     def do_POST(self):
@@ -441,8 +986,13 @@ class APIHandler(SimpleHTTPRequestHandler):
         parsed = urlparse(self.path)
         path = parsed.path
         
+        # Drain any request body so it is not read as the next request
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        
         if path == '/api/run-analysis':
-            if state.status == "running":
+            if not state.begin_run():
                 self.send_json({"status": "already_running", "message": "Analysis already in progress"})
                 return
                 
@@ -455,8 +1005,6 @@ class APIHandler(SimpleHTTPRequestHandler):
 
 def run_full_analysis():
     """Run the complete analysis pipeline"""
-    global state
-    
     print("\n" + "="*60)
     print("STARTING ANALYSIS")
     print("="*60)
@@ -465,50 +1013,46 @@ def run_full_analysis():
         state.status = "running"
         state.progress = 0
         state.message = "Initializing..."
-        time.sleep(0.1)  # Let the state propagate
-        
-        # Step 1: Load data sources
-        state.progress = 5
-        state.message = "Loading tube station data..."
-        time.sleep(0.1)
-        state.tubes = load_tube_stations()
-        print(f"  Loaded {len(state.tubes)} tube stations")
-        
-        state.progress = 15
-        state.message = "Loading bus stop data..."
-        time.sleep(0.1)
-        state.buses = load_bus_stops(state.config)
-        print(f"  Loaded {len(state.buses)} bus stops")
         
-        state.progress = 25
-        state.message = "Loading licensed premises data..."
-        time.sleep(0.1)
-        state.premises = load_licensed_premises()
-        print(f"  Loaded {len(state.premises)} premises")
+        # Step 1: Load data sources (independent, so load them concurrently)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            tubes_future = executor.submit(load_tube_stations)
+            buses_future = executor.submit(load_bus_stops, state.config)
+            premises_future = executor.submit(load_licensed_premises)
+            
+            state.progress = 5
+            state.message = "Loading tube station data..."
+            tubes = tubes_future.result()
+            state.tubes = tubes
+            print(f"  Loaded {len(tubes)} tube stations")
+            
+            state.progress = 15
+            state.message = "Loading bus stop data..."
+            buses = buses_future.result()
+            state.buses = buses
+            print(f"  Loaded {len(buses)} bus stops")
+            
+            state.progress = 25
+            state.message = "Loading licensed premises data..."
+            premises = premises_future.result()
+            state.premises = premises
+            print(f"  Loaded {len(premises)} premises")
         
         # Step 2: Create grid
         state.progress = 35
         state.message = "Creating analysis grid..."
-        time.sleep(0.1)
         cells = create_grid(state.config)
         print(f"  Created {len(cells)} grid cells")
         
         # Step 3: Calculate footfall scores
         state.progress = 45
         state.message = "Calculating footfall scores..."
-        time.sleep(0.1)
-        
-        # Get thread-safe copies
-        tubes = state.tubes
-        buses = state.buses
-        premises = state.premises
         
         cells = calculate_footfall_scores(cells, tubes, buses, premises, state.config)
         print("  Footfall scores calculated")
         
         state.progress = 60
         state.message = "Categorizing footfall zones..."
-        time.sleep(0.1)
         
         # Step 4: Categorize cells
         cells = categorize_cells(cells, state.config)
@@ -518,7 +1062,6 @@ def run_full_analysis():
         # Step 5: Generate sample bins and optimize
         state.progress = 70
         state.message = "Generating sample bin locations..."
-        time.sleep(0.1)
         
         # Create data directory if needed
         Path("data").mkdir(exist_ok=True)
@@ -528,20 +1071,19 @@ def run_full_analysis():
         
         state.progress = 80
         state.message = "Assigning bins to grid cells..."
-        time.sleep(0.1)
         bins = assign_bins_to_cells(bins, cells, state.config)
         
         state.progress = 90
         state.message = "Optimizing sensor placement..."
-        time.sleep(0.1)
-        selected = optimize_sensor_placement(bins, 1000, state.config.N_FOOTFALL_CATEGORIES)
+        selected = optimize_sensor_placement(
+            bins, 1000, state.config.N_FOOTFALL_CATEGORIES, state.config
+        )
         state.bins = bins
         print(f"  Selected {len([b for b in bins if b.selected_for_sensor])} sensor locations")
         
         # Step 6: Save outputs
         state.progress = 95
         state.message = "Saving results..."
-        time.sleep(0.1)
         
         Path("output").mkdir(exist_ok=True)
         save_grid_csv(cells, "output/westminster_footfall_grid.csv")
@@ -562,15 +1104,15 @@ def run_full_analysis():
         traceback.print_exc()
         state.status = "error"
         state.message = f"Error: {str(e)}"
+    finally:
+        state.running.clear()
 
 
-def get_analysis_stats():
+def get_analysis_stats(snap=None):
     """Get current analysis statistics"""
-    tubes = state.tubes
-    buses = state.buses
-    premises = state.premises
-    cells = state.cells
-    bins = state.bins
+    snap = snap or state.snapshot()
+    tubes, buses, premises = snap.tubes, snap.buses, snap.premises
+    cells, bins = snap.cells, snap.bins
     
     stats = {
         "tubes_count": len(tubes) if tubes else 0,
@@ -578,225 +1120,242 @@ def get_analysis_stats():
         "premises_count": len(premises) if premises else 0,
         "cells_count": len(cells) if cells else 0,
         "bins_count": len(bins) if bins else 0,
-        "selected_bins_count": sum(1 for b in bins if b.selected_for_sensor) if bins else 0,
-        "category_distribution": {},
-        "sensor_distribution": {}
+        "selected_bins_count": snap.sensor_distribution.total(),
+        "category_distribution": dict(snap.category_distribution),
+        "sensor_distribution": dict(snap.sensor_distribution)
     }
     
-    if cells:
-        for cell in cells:
-            cat = cell.footfall_category
-            stats["category_distribution"][cat] = stats["category_distribution"].get(cat, 0) + 1
-    
-    if bins:
-        for b in bins:
-            if b.selected_for_sensor:
-                cat = b.footfall_category
-                stats["sensor_distribution"][cat] = stats["sensor_distribution"].get(cat, 0) + 1
-    
     return stats
 
 
-def get_ward_summary():
+def build_cells_frame(cells):
+    """Columnar copy of the cell fields the ward summary groups on"""
+    return pd.DataFrame({
+        "cell_id": [c.cell_id for c in cells],
+        "ward": [getattr(c, 'ward', 'Unknown') or 'Unknown' for c in cells],
+        "road_name": [getattr(c, 'road_name', 'Unknown') or 'Unknown' for c in cells],
+        "footfall_category": [c.footfall_category for c in cells],
+        "estimated_people_per_hour": [getattr(c, 'estimated_people_per_hour', 0) for c in cells],
+        "estimated_bin_fill_rate": [getattr(c, 'estimated_bin_fill_rate', 0) for c in cells],
+    })
+
+
+def build_sensor_frame(bins):
+    """Columnar copy of the selected bins, for the sensor and ward summaries"""
+    selected = [b for b in bins if b.selected_for_sensor]
+    return pd.DataFrame({
+        "bin_id": [b.bin_id for b in selected],
+        "selection_rank": [b.selection_rank for b in selected],
+        "ward": [getattr(b, 'ward', 'Unknown') or 'Unknown' for b in selected],
+        "road_name": [getattr(b, 'road_name', 'Unknown') or 'Unknown' for b in selected],
+        "footfall_category": [b.footfall_category for b in selected],
+        "estimated_people_per_hour": [getattr(b, 'estimated_people_per_hour', 0) for b in selected],
+        "estimated_bin_fill_rate": [getattr(b, 'estimated_bin_fill_rate', 0) for b in selected],
+    })
+
+
+def _aggregate(frame, keys, count_name, count_column):
+    """
+    Count, total footfall and mean fill rate per group.
+    Groups keep first-appearance order so stable sorts break ties the same
+    way the original per-item loops did.
+    """
+    return frame.groupby(keys, sort=False).agg(**{
+        count_name: (count_column, 'size'),
+        "total_people_per_hour": ('estimated_people_per_hour', 'sum'),
+        "avg_fill_rate": ('estimated_bin_fill_rate', 'mean'),
+    })
+
+
+def _category_counts(frame):
+    """{ward: {category: count}} in first-appearance order"""
+    counts = {}
+    grouped = frame.groupby(['ward', 'footfall_category'], sort=False).size()
+    for (ward, cat), n in zip(grouped.index.tolist(), grouped.tolist()):
+        counts.setdefault(ward, {})[cat] = n
+    return counts
+
+
+def _top_per_ward(stats, column, limit):
+    """Group rows by ward, each sorted by column descending and truncated"""
+    ranked = stats.sort_values(column, ascending=False, kind='stable')
+    ranked = ranked.groupby(level='ward', sort=False).head(limit)
+    rows = {}
+    columns = list(ranked.columns)
+    for (ward, road), values in zip(ranked.index.tolist(), ranked.itertuples(index=False, name=None)):
+        row = {"road": road}
+        row.update(zip(columns, values))
+        rows.setdefault(ward, []).append(row)
+    return rows
+
+
+def get_ward_summary(snap=None):
     """Get summary statistics grouped by ward"""
-    cells = state.cells
-    bins = state.bins
+    snap = snap or state.snapshot()
+    cells_df = snap.cells_frame
+    bins = snap.bins
     
-    if not cells:
+    if cells_df is None or cells_df.empty:
         return {"wards": [], "totals": {}}
     
-    ward_data = {}
-    
-    # Aggregate cell data by ward
-    for cell in cells:
-        ward = getattr(cell, 'ward', 'Unknown') or 'Unknown'
-        if ward not in ward_data:
-            ward_data[ward] = {
-                "ward": ward,
-                "cell_count": 0,
-                "total_people_per_hour": 0,
-                "avg_fill_rate": 0,
-                "fill_rates": [],
-                "categories": {},
-                "roads": {},
-                "sensor_count": 0
-            }
-        
-        wd = ward_data[ward]
-        wd["cell_count"] += 1
-        wd["total_people_per_hour"] += getattr(cell, 'estimated_people_per_hour', 0)
-        wd["fill_rates"].append(getattr(cell, 'estimated_bin_fill_rate', 0))
-        
-        cat = cell.footfall_category
-        wd["categories"][cat] = wd["categories"].get(cat, 0) + 1
-        
-        road = getattr(cell, 'road_name', 'Unknown') or 'Unknown'
-        if road not in wd["roads"]:
-            wd["roads"][road] = {
-                "road": road,
-                "cell_count": 0,
-                "total_people_per_hour": 0,
-                "avg_fill_rate": 0,
-                "fill_rates": [],
-                "sensor_count": 0
-            }
-        rd = wd["roads"][road]
-        rd["cell_count"] += 1
-        rd["total_people_per_hour"] += getattr(cell, 'estimated_people_per_hour', 0)
-        rd["fill_rates"].append(getattr(cell, 'estimated_bin_fill_rate', 0))
-    
-    # Count sensors per ward/road
-    if bins:
-        for b in bins:
-            if b.selected_for_sensor:
-                ward = getattr(b, 'ward', 'Unknown') or 'Unknown'
-                road = getattr(b, 'road_name', 'Unknown') or 'Unknown'
-                if ward in ward_data:
-                    ward_data[ward]["sensor_count"] += 1
-                    if road in ward_data[ward]["roads"]:
-                        ward_data[ward]["roads"][road]["sensor_count"] += 1
-    
-    # Calculate averages and format output
-    wards = []
-    total_people = 0
-    total_fill_rates = []
-    total_sensors = 0
-    
-    for ward, wd in ward_data.items():
-        if wd["fill_rates"]:
-            wd["avg_fill_rate"] = sum(wd["fill_rates"]) / len(wd["fill_rates"])
-        del wd["fill_rates"]
-        
-        # Format roads
-        roads = []
-        for road, rd in wd["roads"].items():
-            if rd["fill_rates"]:
-                rd["avg_fill_rate"] = sum(rd["fill_rates"]) / len(rd["fill_rates"])
-            del rd["fill_rates"]
-            roads.append(rd)
-        
-        # Sort roads by people per hour
-        roads.sort(key=lambda x: -x["total_people_per_hour"])
-        wd["roads"] = roads[:15]  # Top 15 roads per ward
-        
-        total_people += wd["total_people_per_hour"]
-        total_fill_rates.append(wd["avg_fill_rate"])
-        total_sensors += wd["sensor_count"]
-        
-        wards.append(wd)
+    ward_stats = _aggregate(cells_df, 'ward', 'cell_count', 'cell_id')
+    road_stats = _aggregate(cells_df, ['ward', 'road_name'], 'cell_count', 'cell_id')
+    
+    # Count sensors per ward/road, only where the ward/road has cells
+    sensors = build_sensor_frame(bins or [])
+    ward_stats["sensor_count"] = (
+        sensors.groupby('ward').size().reindex(ward_stats.index, fill_value=0)
+    )
+    road_stats["sensor_count"] = (
+        sensors.groupby(['ward', 'road_name']).size().reindex(road_stats.index, fill_value=0)
+    )
+    
+    categories = _category_counts(cells_df)
+    roads = _top_per_ward(road_stats, 'total_people_per_hour', 15)  # Top 15 roads per ward
     
     # Sort wards by total footfall
-    wards.sort(key=lambda x: -x["total_people_per_hour"])
+    ward_stats = ward_stats.sort_values('total_people_per_hour', ascending=False, kind='stable')
+    wards = [
+        {
+            "ward": ward,
+            "cell_count": cell_count,
+            "total_people_per_hour": total,
+            "avg_fill_rate": fill,
+            "categories": categories[ward],
+            "roads": roads[ward],
+            "sensor_count": sensor_count
+        }
+        for ward, cell_count, total, fill, sensor_count in zip(
+            ward_stats.index.tolist(),
+            *(ward_stats[col].tolist() for col in
+              ("cell_count", "total_people_per_hour", "avg_fill_rate", "sensor_count"))
+        )
+    ]
     
     return {
         "wards": wards,
         "totals": {
-            "total_people_per_hour": total_people,
-            "avg_fill_rate": sum(total_fill_rates) / len(total_fill_rates) if total_fill_rates else 0,
-            "total_sensors": total_sensors,
+            "total_people_per_hour": sum(w["total_people_per_hour"] for w in wards),
+            "avg_fill_rate": sum(w["avg_fill_rate"] for w in wards) / len(wards) if wards else 0,
+            "total_sensors": sum(w["sensor_count"] for w in wards),
             "ward_count": len(wards)
         }
     }
 
 
-def get_sensor_summary():
+def get_sensor_summary(snap=None):
     """Get sensor placement summary grouped by ward"""
-    bins = state.bins
+    bins = (snap or state.snapshot()).bins
     
     if not bins:
         return {"wards": [], "totals": {}}
     
-    selected_bins = [b for b in bins if b.selected_for_sensor]
-    
-    ward_data = {}
-    
-    for b in selected_bins:
-        ward = getattr(b, 'ward', 'Unknown') or 'Unknown'
-        if ward not in ward_data:
-            ward_data[ward] = {
-                "ward": ward,
-                "sensor_count": 0,
-                "total_people_per_hour": 0,
-                "avg_fill_rate": 0,
-                "fill_rates": [],
-                "categories": {},
-                "roads": {}
-            }
-        
-        wd = ward_data[ward]
-        wd["sensor_count"] += 1
-        wd["total_people_per_hour"] += getattr(b, 'estimated_people_per_hour', 0)
-        wd["fill_rates"].append(getattr(b, 'estimated_bin_fill_rate', 0))
-        
-        cat = b.footfall_category
-        wd["categories"][cat] = wd["categories"].get(cat, 0) + 1
-        
-        road = getattr(b, 'road_name', 'Unknown') or 'Unknown'
-        if road not in wd["roads"]:
-            wd["roads"][road] = {
-                "road": road,
-                "sensor_count": 0,
-                "total_people_per_hour": 0,
-                "avg_fill_rate": 0,
-                "fill_rates": [],
-                "bins": []
-            }
-        rd = wd["roads"][road]
-        rd["sensor_count"] += 1
-        rd["total_people_per_hour"] += getattr(b, 'estimated_people_per_hour', 0)
-        rd["fill_rates"].append(getattr(b, 'estimated_bin_fill_rate', 0))
-        rd["bins"].append({
-            "bin_id": b.bin_id,
-            "rank": b.selection_rank,
-            "fill_rate": round(getattr(b, 'estimated_bin_fill_rate', 0), 1)
-        })
+    sensors = build_sensor_frame(bins)
+    if sensors.empty:
+        return {
+            "wards": [],
+            "totals": {"total_sensors": 0, "total_people_per_hour": 0, "avg_fill_rate": 0, "ward_count": 0}
+        }
     
-    # Calculate averages and format output
-    wards = []
-    total_sensors = 0
-    total_people = 0
-    total_fill_rates = []
+    ward_stats = _aggregate(sensors, 'ward', 'sensor_count', 'bin_id')
+    road_stats = _aggregate(sensors, ['ward', 'road_name'], 'sensor_count', 'bin_id')
+    categories = _category_counts(sensors)
+    roads = _top_per_ward(road_stats, 'sensor_count', 10)  # Top 10 roads per ward
     
-    for ward, wd in ward_data.items():
-        if wd["fill_rates"]:
-            wd["avg_fill_rate"] = sum(wd["fill_rates"]) / len(wd["fill_rates"])
-        del wd["fill_rates"]
-        
-        # Format roads
-        roads = []
-        for road, rd in wd["roads"].items():
-            if rd["fill_rates"]:
-                rd["avg_fill_rate"] = sum(rd["fill_rates"]) / len(rd["fill_rates"])
-            del rd["fill_rates"]
-            # Keep only top 5 bins per road
-            rd["bins"] = sorted(rd["bins"], key=lambda x: x["rank"])[:5]
-            roads.append(rd)
-        
-        roads.sort(key=lambda x: -x["sensor_count"])
-        wd["roads"] = roads[:10]  # Top 10 roads per ward
-        
-        total_sensors += wd["sensor_count"]
-        total_people += wd["total_people_per_hour"]
-        total_fill_rates.append(wd["avg_fill_rate"])
-        
-        wards.append(wd)
+    # Keep only the top 5 bins (by rank) per road
+    top_bins = sensors.sort_values('selection_rank', kind='stable')
+    top_bins = top_bins.groupby(['ward', 'road_name'], sort=False).head(5)
+    road_bins = {}
+    for ward, road, bin_id, rank, fill in zip(
+        top_bins["ward"].tolist(), top_bins["road_name"].tolist(), top_bins["bin_id"].tolist(),
+        top_bins["selection_rank"].tolist(), top_bins["estimated_bin_fill_rate"].tolist()
+    ):
+        road_bins.setdefault((ward, road), []).append(
+            {"bin_id": bin_id, "rank": rank, "fill_rate": round(fill, 1)}
+        )
+    for ward, ward_roads in roads.items():
+        for rd in ward_roads:
+            rd["bins"] = road_bins[(ward, rd["road"])]
     
-    wards.sort(key=lambda x: -x["sensor_count"])
+    ward_stats = ward_stats.sort_values('sensor_count', ascending=False, kind='stable')
+    wards = [
+        {
+            "ward": ward,
+            "sensor_count": sensor_count,
+            "total_people_per_hour": total,
+            "avg_fill_rate": fill,
+            "categories": categories[ward],
+            "roads": roads[ward]
+        }
+        for ward, sensor_count, total, fill in zip(
+            ward_stats.index.tolist(),
+            *(ward_stats[col].tolist() for col in
+              ("sensor_count", "total_people_per_hour", "avg_fill_rate"))
+        )
+    ]
     
     return {
         "wards": wards,
         "totals": {
-            "total_sensors": total_sensors,
-            "total_people_per_hour": total_people,
-            "avg_fill_rate": sum(total_fill_rates) / len(total_fill_rates) if total_fill_rates else 0,
+            "total_sensors": sum(w["sensor_count"] for w in wards),
+            "total_people_per_hour": sum(w["total_people_per_hour"] for w in wards),
+            "avg_fill_rate": sum(w["avg_fill_rate"] for w in wards) / len(wards),
             "ward_count": len(wards)
         }
     }
 
 
+class APIServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server with a bounded number of handler threads.
+    Status polls and static files keep being served while a long request
+    (or the analysis) is running; a connection that finds all max_workers
+    slots busy for slot_wait seconds is answered with a 503 so the accept
+    loop never stalls behind them.
+    """
+    daemon_threads = True
+    request_queue_size = 64
+    max_workers = 32
+    slot_wait = 0.5
+    
+    BUSY_RESPONSE = (
+        b"HTTP/1.1 503 Service Unavailable\r\n"
+        b"Content-Type: text/plain\r\n"
+        b"Content-Length: 12\r\n"
+        b"Retry-After: 1\r\n"
+        b"Connection: close\r\n"
+        b"\r\n"
+        b"Server busy\n"
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._worker_slots = threading.BoundedSemaphore(self.max_workers)
+    
+    def process_request(self, request, client_address):
+        if not self._worker_slots.acquire(timeout=self.slot_wait):
+            try:
+                request.sendall(self.BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._worker_slots.release()
+            raise
+    
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._worker_slots.release()
+
+
 def run_server(port=8080, host='0.0.0.0'):
     """Start the API server"""
-    server = HTTPServer((host, port), APIHandler)
+    server = APIServer((host, port), APIHandler)
     print(f"""
 ╔══════════════════════════════════════════════════════════════════╗
 ║     Westminster Footfall Analysis - Server Running               ║
@@ -147,6 +147,22 @@ function initMaps() {
 // ============================================
 // Data Loading
 // ============================================
+// Grid and bin layers are requested as Geobuf when the decoder scripts loaded
+const GEOBUF_SUPPORTED = typeof geobuf !== 'undefined' && typeof Pbf !== 'undefined';
+
+function fetchFeatures(path) {
+    const headers = GEOBUF_SUPPORTED ? { 'Accept': 'application/x-protobuf' } : {};
+    return fetch(`${CONFIG.apiBase}${path}`, { headers });
+}
+
+async function readFeatures(res) {
+    const type = res.headers.get('Content-Type') || '';
+    if (type.includes('application/x-protobuf')) {
+        return geobuf.decode(new Pbf(await res.arrayBuffer()));
+    }
+    return res.json();
+}
+
 async function loadInitialData() {
     // Load data sources (available before analysis)
     try {
@@ -213,24 +229,24 @@ async function loadGridData() {
     try {
         // Load different grid views
         const [gridRes, tubeRes, busRes, premisesRes] = await Promise.all([
-            fetch(`${CONFIG.apiBase}/api/grid`),
-            fetch(`${CONFIG.apiBase}/api/grid/tube`),
-            fetch(`${CONFIG.apiBase}/api/grid/bus`),
-            fetch(`${CONFIG.apiBase}/api/grid/premises`)
+            fetchFeatures('/api/grid'),
+            fetchFeatures('/api/grid/tube'),
+            fetchFeatures('/api/grid/bus'),
+            fetchFeatures('/api/grid/premises')
         ]);
         
         if (gridRes.ok) {
-            analysisData.grid = await gridRes.json();
+            analysisData.grid = await readFeatures(gridRes);
             displayCombinedGrid();
         }
         if (tubeRes.ok) {
-            analysisData.gridTube = await tubeRes.json();
+            analysisData.gridTube = await readFeatures(tubeRes);
         }
         if (busRes.ok) {
-            analysisData.gridBus = await busRes.json();
+            analysisData.gridBus = await readFeatures(busRes);
         }
         if (premisesRes.ok) {
-            analysisData.gridPremises = await premisesRes.json();
+            analysisData.gridPremises = await readFeatures(premisesRes);
         }
     } catch (e) {
         console.log('Grid data not yet available');
@@ -240,15 +256,15 @@ async function loadGridData() {
 async function loadSensorData() {
     try {
         const [binsRes, selectedRes] = await Promise.all([
-            fetch(`${CONFIG.apiBase}/api/bins`),
-            fetch(`${CONFIG.apiBase}/api/selected-bins`)
+            fetchFeatures('/api/bins'),
+            fetchFeatures('/api/selected-bins')
         ]);
         
         if (binsRes.ok) {
-            analysisData.bins = await binsRes.json();
+            analysisData.bins = await readFeatures(binsRes);
         }
         if (selectedRes.ok) {
-            analysisData.selectedBins = await selectedRes.json();
+            analysisData.selectedBins = await readFeatures(selectedRes);
             displaySensorMap();
             updateSensorDistribution();
         }
@@ -25,27 +25,45 @@ Date: December 2024
 
 import os
 import json
+import hashlib
 import warnings
 from pathlib import Path
 from typing import Optional, Tuple, List, Dict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
 import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point, Polygon, MultiPolygon, box
+import shapely
+from shapely.geometry import Polygon, MultiPolygon, box
 from shapely.ops import unary_union
 import requests
 from tqdm import tqdm
 from scipy.spatial import cKDTree
-from sklearn.preprocessing import MinMaxScaler, StandardScaler
-from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+from sklearn.cluster import MiniBatchKMeans
 import h3
+from pyproj import Transformer
 import folium
-from folium.plugins import MarkerCluster
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    import pyogrio  # noqa: F401
+    HAS_PYOGRIO = True
+except ImportError:
+    HAS_PYOGRIO = False
+
+# Vectorized OGR I/O when pyogrio is present; None lets geopandas pick (Fiona)
+GEO_IO_ENGINE = "pyogrio" if HAS_PYOGRIO else None
+
 warnings.filterwarnings('ignore')
 
 # =============================================================================
@@ -76,9 +94,16 @@ class Config:
     BUS_WEIGHT = 0.30
     PREMISES_WEIGHT = 0.25
     
+    # Layers with at most this many points are scored by brute force in the
+    # Numba kernel (when available) instead of a sparse distance query
+    BRUTE_FORCE_MAX_POIS = 5000
+    
     # Number of footfall categories
     N_FOOTFALL_CATEGORIES = 8
     
+    # Mini-batch size for K-means; fixed so categories don't depend on the machine
+    KMEANS_BATCH_SIZE = 1024
+    
     # Output directory
     OUTPUT_DIR = Path("output")
     DATA_DIR = Path("data")
@@ -191,8 +216,7 @@ class DataLoader:
         ]
         
         df = pd.DataFrame(westminster_stations)
-        geometry = [Point(xy) for xy in zip(df.lon, df.lat)]
-        gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
+        gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df.lon, df.lat), crs="EPSG:4326")
         
         print(f"  Loaded {len(gdf)} tube stations in Westminster area")
         print(f"  Total annual usage: {df['annual_usage'].sum():.1f} million entries/exits")
@@ -231,53 +255,40 @@ class DataLoader:
             {"corridor": "Vauxhall Bridge Road", "lon": -0.1380, "lat_range": (51.49, 51.50), "freq": 25},
         ]
         
-        bus_stops = []
-        stop_id = 0
+        rng = np.random.default_rng(42)
+        corridor_names, lats, lons, frequencies = [], [], [], []
         
         for corridor in high_frequency_corridors:
             if 'lon_range' in corridor:
                 # Horizontal corridor
-                lons = np.linspace(corridor['lon_range'][0], corridor['lon_range'][1], 8)
-                for lon in lons:
-                    bus_stops.append({
-                        "stop_id": f"BS{stop_id:04d}",
-                        "corridor": corridor['corridor'],
-                        "lat": corridor['lat'] + np.random.uniform(-0.001, 0.001),
-                        "lon": lon,
-                        "frequency": corridor['freq'] + np.random.randint(-5, 5)
-                    })
-                    stop_id += 1
+                n = 8
+                lons.append(np.linspace(corridor['lon_range'][0], corridor['lon_range'][1], n))
+                lats.append(corridor['lat'] + rng.uniform(-0.001, 0.001, n))
             else:
                 # Vertical corridor
-                lats = np.linspace(corridor['lat_range'][0], corridor['lat_range'][1], 6)
-                for lat in lats:
-                    bus_stops.append({
-                        "stop_id": f"BS{stop_id:04d}",
-                        "corridor": corridor['corridor'],
-                        "lat": lat,
-                        "lon": corridor['lon'] + np.random.uniform(-0.001, 0.001),
-                        "frequency": corridor['freq'] + np.random.randint(-5, 5)
-                    })
-                    stop_id += 1
+                n = 6
+                lats.append(np.linspace(corridor['lat_range'][0], corridor['lat_range'][1], n))
+                lons.append(corridor['lon'] + rng.uniform(-0.001, 0.001, n))
+            frequencies.append(corridor['freq'] + rng.integers(-5, 5, n))
+            corridor_names.append(np.full(n, corridor['corridor'], dtype=object))
         
         # Add additional stops across the borough
-        np.random.seed(42)
         n_additional = 200
-        for _ in range(n_additional):
-            lat = np.random.uniform(bounds['min_lat'] + 0.01, bounds['max_lat'] - 0.01)
-            lon = np.random.uniform(bounds['min_lon'] + 0.01, bounds['max_lon'] - 0.01)
-            bus_stops.append({
-                "stop_id": f"BS{stop_id:04d}",
-                "corridor": "Local",
-                "lat": lat,
-                "lon": lon,
-                "frequency": np.random.randint(5, 25)
-            })
-            stop_id += 1
-        
-        df = pd.DataFrame(bus_stops)
-        geometry = [Point(xy) for xy in zip(df.lon, df.lat)]
-        gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
+        lats.append(rng.uniform(bounds['min_lat'] + 0.01, bounds['max_lat'] - 0.01, n_additional))
+        lons.append(rng.uniform(bounds['min_lon'] + 0.01, bounds['max_lon'] - 0.01, n_additional))
+        frequencies.append(rng.integers(5, 25, n_additional))
+        corridor_names.append(np.full(n_additional, "Local", dtype=object))
+        
+        lats = np.concatenate(lats)
+        lons = np.concatenate(lons)
+        df = pd.DataFrame({
+            "stop_id": [f"BS{stop_id:04d}" for stop_id in range(len(lats))],
+            "corridor": np.concatenate(corridor_names),
+            "lat": lats,
+            "lon": lons,
+            "frequency": np.concatenate(frequencies)
+        })
+        gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(lons, lats), crs="EPSG:4326")
         
         print(f"  Generated {len(gdf)} bus stops across Westminster")
         
@@ -305,46 +316,38 @@ class DataLoader:
             {"name": "St James", "center": (51.5060, -0.1380), "radius": 0.006, "density": 40},
         ]
         
-        premises = []
-        premises_id = 0
-        np.random.seed(43)
-        
-        for hotspot in hotspots:
-            n_premises = hotspot['density']
-            for _ in range(n_premises):
-                # Generate points within the hotspot radius
-                angle = np.random.uniform(0, 2 * np.pi)
-                r = hotspot['radius'] * np.sqrt(np.random.uniform(0, 1))
-                lat = hotspot['center'][0] + r * np.cos(angle)
-                lon = hotspot['center'][1] + r * np.sin(angle)
-                
-                # Assign premises type and capacity
-                premises_type = np.random.choice(
-                    ['Restaurant', 'Pub', 'Bar', 'Club', 'Cafe', 'Hotel Bar'],
-                    p=[0.35, 0.25, 0.20, 0.05, 0.10, 0.05]
-                )
-                capacity = {
-                    'Restaurant': np.random.randint(30, 150),
-                    'Pub': np.random.randint(50, 200),
-                    'Bar': np.random.randint(40, 150),
-                    'Club': np.random.randint(100, 500),
-                    'Cafe': np.random.randint(15, 60),
-                    'Hotel Bar': np.random.randint(30, 100)
-                }[premises_type]
-                
-                premises.append({
-                    "premises_id": f"LP{premises_id:05d}",
-                    "area": hotspot['name'],
-                    "type": premises_type,
-                    "lat": lat,
-                    "lon": lon,
-                    "capacity": capacity
-                })
-                premises_id += 1
-        
-        df = pd.DataFrame(premises)
-        geometry = [Point(xy) for xy in zip(df.lon, df.lat)]
-        gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
+        premises_types = np.array(['Restaurant', 'Pub', 'Bar', 'Club', 'Cafe', 'Hotel Bar'], dtype=object)
+        type_probs = [0.35, 0.25, 0.20, 0.05, 0.10, 0.05]
+        # Capacity range per premises type, in the same order
+        capacity_low = np.array([30, 50, 40, 100, 15, 30])
+        capacity_high = np.array([150, 200, 150, 500, 60, 100])
+        
+        rng = np.random.default_rng(43)
+        counts = [hotspot['density'] for hotspot in hotspots]
+        total = sum(counts)
+        
+        # Generate points within each hotspot radius
+        center_lat = np.repeat([hotspot['center'][0] for hotspot in hotspots], counts)
+        center_lon = np.repeat([hotspot['center'][1] for hotspot in hotspots], counts)
+        radius = np.repeat([hotspot['radius'] for hotspot in hotspots], counts)
+        angle = rng.uniform(0, 2 * np.pi, total)
+        r = radius * np.sqrt(rng.uniform(0, 1, total))
+        lats = center_lat + r * np.cos(angle)
+        lons = center_lon + r * np.sin(angle)
+        
+        # Assign premises type and capacity
+        type_idx = rng.choice(len(premises_types), size=total, p=type_probs)
+        capacity = rng.integers(capacity_low[type_idx], capacity_high[type_idx])
+        
+        df = pd.DataFrame({
+            "premises_id": [f"LP{premises_id:05d}" for premises_id in range(total)],
+            "area": np.repeat(np.array([hotspot['name'] for hotspot in hotspots], dtype=object), counts),
+            "type": premises_types[type_idx],
+            "lat": lats,
+            "lon": lons,
+            "capacity": capacity
+        })
+        gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(lons, lats), crs="EPSG:4326")
         
         print(f"  Generated {len(gdf)} licensed premises across Westminster")
         print(f"  By type: {df['type'].value_counts().to_dict()}")
@@ -359,8 +362,12 @@ class DataLoader:
 class HexGridGenerator:
     """Generate H3 hexagonal grid for Westminster"""
     
+    # Bump whenever the grid construction or the cached columns change
+    CACHE_VERSION = 3
+    
     def __init__(self, config: Config):
         self.config = config
+        self.transformer = Transformer.from_crs(4326, 27700, always_xy=True)
     
     def create_hexagonal_grid(self, boundary: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
         """Create H3 hexagonal grid covering Westminster"""
@@ -369,56 +376,139 @@ class HexGridGenerator:
         # Get boundary polygon
         boundary_polygon = boundary.geometry.iloc[0]
         
-        # Get all H3 hexagons that cover the boundary
+        # Reuse the grid from a previous run with the same boundary and resolution
+        cache_path = self._cache_path(boundary_polygon)
+        if cache_path.exists():
+            gdf = self._load_cache(cache_path)
+            if gdf is not None:
+                print(f"  Loaded {len(gdf)} hexagonal cells from {cache_path}")
+                return gdf
+        
+        # Get all H3 hexagons that can touch the boundary: polyfill only keeps
+        # cells whose centres are inside, so fill the boundary grown by one
+        # cell radius and let the clip below drop the cells that miss it
+        # (polyfill does the containment test in C, one call per polygon)
         hexagons = set()
-        
-        # Sample points within the boundary to find all hexagons
-        minx, miny, maxx, maxy = boundary_polygon.bounds
-        
-        # Create a fine grid of points
-        step = 0.001  # Approximately 100m
-        for lon in np.arange(minx, maxx, step):
-            for lat in np.arange(miny, maxy, step):
-                point = Point(lon, lat)
-                if boundary_polygon.contains(point):
-                    h3_index = h3.geo_to_h3(lat, lon, self.config.H3_RESOLUTION)
-                    hexagons.add(h3_index)
-        
-        # Also add hexagons from boundary
-        coords = list(boundary_polygon.exterior.coords)
-        for lon, lat in coords:
-            h3_index = h3.geo_to_h3(lat, lon, self.config.H3_RESOLUTION)
-            hexagons.add(h3_index)
+        for polygon in getattr(self._buffer_by_cell(boundary_polygon), 'geoms', []):
+            hexagons.update(h3.polyfill(
+                polygon.__geo_interface__, self.config.H3_RESOLUTION, geo_json_conformant=True
+            ))
         
         # Convert H3 indices to polygons
-        hex_data = []
-        for h3_index in hexagons:
-            # Get hexagon boundary
-            boundary_coords = h3.h3_to_geo_boundary(h3_index, geo_json=True)
-            hex_polygon = Polygon(boundary_coords)
-            
-            # Get center
-            center = h3.h3_to_geo(h3_index)
-            
-            hex_data.append({
-                'h3_index': h3_index,
-                'center_lat': center[0],
-                'center_lon': center[1],
-                'geometry': hex_polygon
-            })
-        
-        gdf = gpd.GeoDataFrame(hex_data, crs="EPSG:4326")
+        h3_indices = list(hexagons)
+        centers = [h3.h3_to_geo(h3_index) for h3_index in h3_indices]
+        gdf = gpd.GeoDataFrame(
+            {
+                'h3_index': h3_indices,
+                'center_lat': [center[0] for center in centers],
+                'center_lon': [center[1] for center in centers],
+            },
+            geometry=[
+                Polygon(h3.h3_to_geo_boundary(h3_index, geo_json=True))
+                for h3_index in h3_indices
+            ],
+            crs="EPSG:4326"
+        )
         
-        # Clip to Westminster boundary
-        gdf = gpd.clip(gdf, boundary)
+        # Clip to Westminster boundary: cells the boundary fully covers keep
+        # their H3 polygon, only the straddling ring is intersected
+        hex_area = gdf.geometry.area
+        shapely.prepare(boundary_polygon)
+        geoms = gdf.geometry.values
+        straddling = ~shapely.covers(boundary_polygon, geoms)
+        geoms[straddling] = shapely.intersection(boundary_polygon, geoms[straddling])
+        gdf.geometry = geoms
+        gdf = gdf[shapely.area(geoms) > 0]
+        
+        # Calculate area of each hexagon from H3's native cell area, scaled
+        # by the fraction of the cell kept by the clip
+        cell_area = np.fromiter(
+            (h3.cell_area(h3_index, unit='m^2') for h3_index in gdf['h3_index']),
+            dtype=np.float64, count=len(gdf)
+        )
+        gdf['area_m2'] = cell_area * (gdf.geometry.area / hex_area[gdf.index]).to_numpy()
         
-        # Calculate area of each hexagon
-        gdf_projected = gdf.to_crs("EPSG:27700")  # British National Grid
-        gdf['area_m2'] = gdf_projected.geometry.area
+        # Cell centroids, projected once here so the cache carries them:
+        # BNG centroids (as lat/lon) for the maps and CSV export, and the
+        # projected WGS84 centroids the scorer measures distances from
+        centroids = gdf.to_crs("EPSG:27700").geometry.centroid.to_crs("EPSG:4326")
+        gdf['_centroid_lat'] = centroids.y.to_numpy()
+        gdf['_centroid_lon'] = centroids.x.to_numpy()
+        lonlat = shapely.get_coordinates(shapely.centroid(gdf.geometry.values))
+        gdf['_centroid_x'], gdf['_centroid_y'] = self.transformer.transform(lonlat[:, 0], lonlat[:, 1])
         
         print(f"  Created {len(gdf)} hexagonal cells")
         print(f"  Average cell area: {gdf['area_m2'].mean():.0f} m²")
         
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._save_cache(gdf, cache_path)
+        
+        return gdf
+    
+    def _buffer_by_cell(self, boundary_polygon) -> MultiPolygon:
+        """Boundary grown by the centre-to-vertex radius of a local H3 cell"""
+        centre = boundary_polygon.centroid
+        cell = h3.geo_to_h3(centre.y, centre.x, self.config.H3_RESOLUTION)
+        lat, lon = h3.h3_to_geo(cell)
+        vertices = np.array(h3.h3_to_geo_boundary(cell, geo_json=True))
+        x, y = self.transformer.transform(vertices[:, 0], vertices[:, 1])
+        cx, cy = self.transformer.transform(lon, lat)
+        # A little slack for cells elsewhere in the borough being larger
+        radius = 1.05 * np.hypot(x - cx, y - cy).max()
+        buffered = gpd.GeoSeries([boundary_polygon], crs="EPSG:4326").to_crs("EPSG:27700").buffer(radius)
+        buffered = buffered.to_crs("EPSG:4326").iloc[0]
+        return buffered if isinstance(buffered, MultiPolygon) else MultiPolygon([buffered])
+    
+    def _cache_path(self, boundary_polygon) -> Path:
+        """Grid cache file keyed by cache version, boundary geometry and H3 resolution"""
+        key = hashlib.sha1(
+            f"v{self.CACHE_VERSION}:{self.config.H3_RESOLUTION}:".encode() + boundary_polygon.wkb
+        ).hexdigest()[:12]
+        return self.config.DATA_DIR / f"hex_{key}.npz"
+    
+    @staticmethod
+    def _save_cache(gdf: gpd.GeoDataFrame, cache_path: Path):
+        """Write the grid as plain arrays (WKB geometry bytes plus offsets), no pickles"""
+        wkb = shapely.to_wkb(gdf.geometry.values)
+        offsets = np.zeros(len(wkb) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in wkb], out=offsets[1:])
+        columns = {
+            column: gdf[column].to_numpy(dtype=np.float64)
+            for column in gdf.columns if column not in ('h3_index', 'geometry')
+        }
+        with open(cache_path, 'wb') as f:
+            np.savez(
+                f,
+                index=gdf.index.to_numpy(dtype=np.int64),
+                h3_index=np.array(gdf['h3_index'].tolist(), dtype=str),
+                wkb=np.frombuffer(b''.join(wkb), dtype=np.uint8),
+                wkb_offsets=offsets,
+                **columns
+            )
+    
+    @staticmethod
+    def _load_cache(cache_path: Path) -> Optional[gpd.GeoDataFrame]:
+        """Read a grid written by _save_cache; None if the file is unreadable"""
+        try:
+            with np.load(cache_path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError) as e:
+            print(f"  Warning: ignoring unreadable grid cache {cache_path}: {e}")
+            return None
+        
+        wkb = arrays.pop('wkb').tobytes()
+        offsets = arrays.pop('wkb_offsets').tolist()
+        index = arrays.pop('index')
+        geometry = shapely.from_wkb([wkb[a:b] for a, b in zip(offsets[:-1], offsets[1:])])
+        h3_indices = arrays.pop('h3_index').tolist()
+        columns = {
+            'h3_index': h3_indices,
+            'center_lat': arrays.pop('center_lat'),
+            'center_lon': arrays.pop('center_lon'),
+        }
+        gdf = gpd.GeoDataFrame(columns, geometry=geometry, index=index, crs="EPSG:4326")
+        for column, values in arrays.items():
+            gdf[column] = values
         return gdf
 
 
@@ -426,11 +516,38 @@ class HexGridGenerator:
 # FOOTFALL SCORING
 # =============================================================================
 
+@dataclass
+class POILayer:
+    """Struct-of-arrays view of one POI layer for the scoring kernels"""
+    x: np.ndarray  # (N,) float32 meters east of the scoring origin
+    y: np.ndarray  # (N,) float32 meters north of the scoring origin
+    w: np.ndarray  # (N,) float32 weights
+    
+    def __post_init__(self):
+        self.tree = cKDTree(np.column_stack([self.x, self.y]))
+
+
 class FootfallScorer:
     """Calculate footfall scores for each hexagonal cell"""
     
     def __init__(self, config: Config):
         self.config = config
+        # WGS84 lon/lat -> British National Grid meters
+        self.transformer = Transformer.from_crs(4326, 27700, always_xy=True)
+    
+    def _project(self, points) -> np.ndarray:
+        """Project an array of WGS84 points to an (N, 2) array of BNG meters"""
+        lonlat = shapely.get_coordinates(points)
+        return np.column_stack(self.transformer.transform(lonlat[:, 0], lonlat[:, 1]))
+    
+    def _poi_layer(self, gdf: gpd.GeoDataFrame, weight_column: str, origin) -> POILayer:
+        """Project a POI GeoDataFrame once into a float32 POILayer"""
+        xy = self._project(gdf.geometry.values) - origin
+        return POILayer(
+            x=np.ascontiguousarray(xy[:, 0], dtype=np.float32),
+            y=np.ascontiguousarray(xy[:, 1], dtype=np.float32),
+            w=gdf[weight_column].to_numpy(dtype=np.float32)
+        )
     
     def calculate_scores(
         self,
@@ -442,135 +559,152 @@ class FootfallScorer:
         """Calculate comprehensive footfall score for each hexagon"""
         print("Calculating footfall scores...")
         
-        # Project to meters for distance calculations
-        hex_proj = hex_grid.to_crs("EPSG:27700")
-        tube_proj = tube_stations.to_crs("EPSG:27700")
-        bus_proj = bus_stops.to_crs("EPSG:27700")
-        premises_proj = premises.to_crs("EPSG:27700")
-        
-        # Create spatial indices
-        hex_centers = np.array([(geom.centroid.x, geom.centroid.y) for geom in hex_proj.geometry])
-        tube_coords = np.array([(geom.x, geom.y) for geom in tube_proj.geometry])
-        bus_coords = np.array([(geom.x, geom.y) for geom in bus_proj.geometry])
-        premises_coords = np.array([(geom.x, geom.y) for geom in premises_proj.geometry])
-        
-        tube_tree = cKDTree(tube_coords)
-        bus_tree = cKDTree(bus_coords)
-        premises_tree = cKDTree(premises_coords)
-        
-        print("  Calculating tube station influence...")
-        tube_scores = self._calculate_tube_influence(
-            hex_centers, tube_tree, tube_proj, tube_coords
-        )
-        
-        print("  Calculating bus stop influence...")
-        bus_scores = self._calculate_bus_influence(
-            hex_centers, bus_tree, bus_proj, bus_coords
-        )
-        
-        print("  Calculating licensed premises influence...")
-        premises_scores = self._calculate_premises_influence(
-            hex_centers, premises_tree, premises_proj, premises_coords
+        # Project coordinates to meters for distance calculations. Offsets
+        # from the grid's mean centre keep float32 precision to millimetres.
+        if '_centroid_x' in hex_grid.columns:
+            hex_xy = hex_grid[['_centroid_x', '_centroid_y']].to_numpy()
+        else:
+            hex_xy = self._project(shapely.centroid(hex_grid.geometry.values))
+        origin = hex_xy.mean(axis=0)
+        hex_centers = (hex_xy - origin).astype(np.float32)
+        
+        pois = (
+            self._poi_layer(tube_stations, 'annual_usage', origin),
+            self._poi_layer(bus_stops, 'frequency', origin),
+            self._poi_layer(premises, 'capacity', origin),
         )
+        tube_scores, bus_scores, premises_scores = self._score_centers(hex_centers, pois)
         
         # Normalize scores
-        scaler = MinMaxScaler()
-        tube_norm = scaler.fit_transform(tube_scores.reshape(-1, 1)).flatten()
-        bus_norm = scaler.fit_transform(bus_scores.reshape(-1, 1)).flatten()
-        premises_norm = scaler.fit_transform(premises_scores.reshape(-1, 1)).flatten()
+        tube_norm, bus_norm, premises_norm = self._normalize(
+            np.column_stack([tube_scores, bus_scores, premises_scores])
+        ).T
         
         # Calculate weighted composite score
         composite_score = (
             self.config.TUBE_WEIGHT * tube_norm +
             self.config.BUS_WEIGHT * bus_norm +
             self.config.PREMISES_WEIGHT * premises_norm
-        )
+        ).astype(np.float64)
         
         # Add scores to hex grid
         hex_grid = hex_grid.copy()
-        hex_grid['tube_score'] = tube_scores
-        hex_grid['bus_score'] = bus_scores
-        hex_grid['premises_score'] = premises_scores
-        hex_grid['tube_score_norm'] = tube_norm
-        hex_grid['bus_score_norm'] = bus_norm
-        hex_grid['premises_score_norm'] = premises_norm
+        hex_grid['tube_score'] = tube_scores.astype(np.float64)
+        hex_grid['bus_score'] = bus_scores.astype(np.float64)
+        hex_grid['premises_score'] = premises_scores.astype(np.float64)
+        hex_grid['tube_score_norm'] = tube_norm.astype(np.float64)
+        hex_grid['bus_score_norm'] = bus_norm.astype(np.float64)
+        hex_grid['premises_score_norm'] = premises_norm.astype(np.float64)
         hex_grid['footfall_score'] = composite_score
         
-        # Calculate percentile rank
-        hex_grid['footfall_percentile'] = hex_grid['footfall_score'].rank(pct=True) * 100
+        # Calculate percentile rank (ties share their average rank)
+        sorted_scores = np.sort(composite_score)
+        lo = np.searchsorted(sorted_scores, composite_score, side='left')
+        hi = np.searchsorted(sorted_scores, composite_score, side='right')
+        hex_grid['footfall_percentile'] = (lo + hi + 1) / 2 / len(composite_score) * 100
         
         print(f"  Score range: {composite_score.min():.3f} - {composite_score.max():.3f}")
         print(f"  Mean score: {composite_score.mean():.3f}")
         
         return hex_grid
     
-    def _calculate_tube_influence(
-        self, hex_centers, tube_tree, tube_gdf, tube_coords
-    ) -> np.ndarray:
-        """Calculate tube station influence using inverse distance weighted by usage"""
-        scores = np.zeros(len(hex_centers))
-        radius = self.config.TUBE_INFLUENCE_RADIUS
+    @staticmethod
+    def _normalize(raw: np.ndarray) -> np.ndarray:
+        """Min-max scale each column of a stacked (N, k) score array to [0, 1]"""
+        mn = raw.min(axis=0)
+        mx = raw.max(axis=0)
+        return (raw - mn) / np.where(mx > mn, mx - mn, 1.0)
+    
+    def _score_centers(self, centers, pois):
+        """Raw tube, bus and premises influence at each projected centre"""
+        tube_layer, bus_layer, premises_layer = pois
         
-        for i, center in enumerate(hex_centers):
-            # Find all tube stations within influence radius
-            indices = tube_tree.query_ball_point(center, radius)
-            
-            if indices:
-                for idx in indices:
-                    dist = np.linalg.norm(center - tube_coords[idx])
-                    if dist < 10:  # Minimum distance to avoid division issues
-                        dist = 10
-                    
-                    # Inverse distance weighted by annual usage
-                    usage = tube_gdf.iloc[idx]['annual_usage']
-                    influence = usage * (1 - dist / radius) ** 2
-                    scores[i] += influence
-        
-        return scores
-    
-    def _calculate_bus_influence(
-        self, hex_centers, bus_tree, bus_gdf, bus_coords
-    ) -> np.ndarray:
-        """Calculate bus stop influence using inverse distance weighted by frequency"""
-        scores = np.zeros(len(hex_centers))
-        radius = self.config.BUS_INFLUENCE_RADIUS
+        print("  Calculating tube station influence...")
+        tube_scores = self._calculate_tube_influence(centers, tube_layer)
         
-        for i, center in enumerate(hex_centers):
-            indices = bus_tree.query_ball_point(center, radius)
-            
-            if indices:
-                for idx in indices:
-                    dist = np.linalg.norm(center - bus_coords[idx])
-                    if dist < 5:
-                        dist = 5
-                    
-                    frequency = bus_gdf.iloc[idx]['frequency']
-                    influence = frequency * (1 - dist / radius)
-                    scores[i] += influence
-        
-        return scores
-    
-    def _calculate_premises_influence(
-        self, hex_centers, premises_tree, premises_gdf, premises_coords
-    ) -> np.ndarray:
+        print("  Calculating bus stop influence...")
+        bus_scores = self._calculate_bus_influence(centers, bus_layer)
+        
+        print("  Calculating licensed premises influence...")
+        premises_scores = self._calculate_premises_influence(centers, premises_layer)
+        
+        return tube_scores, bus_scores, premises_scores
+    
+    def _calculate_tube_influence(self, centers, layer: POILayer) -> np.ndarray:
+        """Calculate tube station influence using inverse distance weighted by usage"""
+        return self._calculate_influence(
+            centers, layer,
+            self.config.TUBE_INFLUENCE_RADIUS, min_dist=10, exponent=2
+        )
+    
+    def _calculate_bus_influence(self, centers, layer: POILayer) -> np.ndarray:
+        """Calculate bus stop influence using inverse distance weighted by frequency"""
+        return self._calculate_influence(
+            centers, layer,
+            self.config.BUS_INFLUENCE_RADIUS, min_dist=5, exponent=1
+        )
+    
+    def _calculate_premises_influence(self, centers, layer: POILayer) -> np.ndarray:
         """Calculate licensed premises influence weighted by capacity"""
-        scores = np.zeros(len(hex_centers))
-        radius = self.config.PREMISES_INFLUENCE_RADIUS
+        return self._calculate_influence(
+            centers, layer,
+            self.config.PREMISES_INFLUENCE_RADIUS, min_dist=5, exponent=1
+        )
+    
+    def _calculate_influence(
+        self, centers, layer: POILayer, radius, min_dist, exponent
+    ) -> np.ndarray:
+        """
+        Sum weight * (1 - dist / radius) ** exponent over every POI within
+        radius of each hex centre
+        """
+        if HAS_NUMBA and len(layer.w) <= self.config.BRUTE_FORCE_MAX_POIS:
+            return _influence_kernel(
+                np.ascontiguousarray(centers[:, 0]), np.ascontiguousarray(centers[:, 1]),
+                layer.x, layer.y, layer.w,
+                np.float32(radius), np.float32(min_dist), exponent
+            )
         
-        for i, center in enumerate(hex_centers):
-            indices = premises_tree.query_ball_point(center, radius)
-            
-            if indices:
-                for idx in indices:
-                    dist = np.linalg.norm(center - premises_coords[idx])
-                    if dist < 5:
-                        dist = 5
-                    
-                    capacity = premises_gdf.iloc[idx]['capacity']
-                    influence = capacity * (1 - dist / radius)
-                    scores[i] += influence
-        
-        return scores
+        # One batched ball query across all centres, threaded in C
+        neighbors = layer.tree.query_ball_point(
+            centers, radius, workers=-1, return_sorted=False
+        )
+        counts = np.fromiter(map(len, neighbors), dtype=np.intp, count=len(neighbors))
+        rows = np.repeat(np.arange(len(centers)), counts)
+        cols = np.concatenate(neighbors).astype(np.intp) if counts.any() else np.empty(0, np.intp)
+        
+        # Minimum distance to avoid division issues
+        dx = centers[rows, 0].astype(np.float64) - layer.x[cols]
+        dy = centers[rows, 1].astype(np.float64) - layer.y[cols]
+        dist = np.maximum(np.hypot(dx, dy), min_dist)
+        influence = layer.w[cols] * (1 - dist * (1.0 / radius)) ** exponent
+        return np.bincount(rows, weights=influence, minlength=len(centers)).astype(np.float32)
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, boundscheck=False, cache=True)
+    def _influence_kernel(hex_x, hex_y, poi_x, poi_y, weights, radius, min_dist, exponent):
+        """
+        Brute-force influence sum over all POIs for each hex centre. The POI
+        coordinates are separate unit-stride arrays so the inner loop vectorizes.
+        """
+        out = np.zeros(hex_x.shape[0], dtype=np.float32)
+        # Reject on squared distance so sqrt only runs for accepted POIs
+        r2 = radius * radius
+        inv_r = np.float32(1.0) / radius
+        for i in prange(hex_x.shape[0]):
+            cx = hex_x[i]
+            cy = hex_y[i]
+            total = 0.0
+            for j in range(poi_x.shape[0]):
+                dx = cx - poi_x[j]
+                dy = cy - poi_y[j]
+                d2 = dx * dx + dy * dy
+                if d2 <= r2:
+                    dist = max(np.sqrt(d2), min_dist)
+                    total += weights[j] * (np.float32(1.0) - dist * inv_r) ** exponent
+            out[i] = total
+        return out
 
 
 # =============================================================================
@@ -594,7 +728,7 @@ class FootfallCategorizer:
         ]
     
     def categorize(self, hex_grid: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
-        """Assign footfall categories using K-means clustering"""
+        """Assign footfall categories using mini-batch K-means clustering"""
         print(f"Categorizing into {self.config.N_FOOTFALL_CATEGORIES} footfall zones...")
         
         hex_grid = hex_grid.copy()
@@ -602,28 +736,29 @@ class FootfallCategorizer:
         # Prepare features for clustering
         features = hex_grid[['tube_score_norm', 'bus_score_norm', 'premises_score_norm']].values
         
-        # K-means clustering
-        kmeans = KMeans(
+        # Mini-batch K-means clustering
+        kmeans = MiniBatchKMeans(
             n_clusters=self.config.N_FOOTFALL_CATEGORIES,
             random_state=42,
-            n_init=10
+            batch_size=self.config.KMEANS_BATCH_SIZE,
+            n_init=3,
+            max_no_improvement=10
         )
         hex_grid['cluster'] = kmeans.fit_predict(features)
         
         # Order clusters by mean footfall score
         cluster_means = hex_grid.groupby('cluster')['footfall_score'].mean().sort_values()
         cluster_mapping = {old: new for new, old in enumerate(cluster_means.index)}
-        hex_grid['footfall_category'] = hex_grid['cluster'].map(cluster_mapping)
-        hex_grid['footfall_category_name'] = hex_grid['footfall_category'].map(
-            lambda x: self.category_names[x]
+        hex_grid['footfall_category'] = hex_grid['cluster'].map(cluster_mapping).astype(np.int8)
+        hex_grid['footfall_category_name'] = pd.Categorical.from_codes(
+            hex_grid['footfall_category'].to_numpy(), categories=self.category_names
         )
         
         # Print category statistics
         print("\n  Footfall Category Distribution:")
-        for cat in range(self.config.N_FOOTFALL_CATEGORIES):
-            count = (hex_grid['footfall_category'] == cat).sum()
-            mean_score = hex_grid[hex_grid['footfall_category'] == cat]['footfall_score'].mean()
-            print(f"    {self.category_names[cat]}: {count} cells (mean score: {mean_score:.3f})")
+        stats = hex_grid.groupby('footfall_category')['footfall_score'].agg(['count', 'mean'])
+        for cat, (count, mean_score) in stats.iterrows():
+            print(f"    {self.category_names[cat]}: {count:.0f} cells (mean score: {mean_score:.3f})")
         
         return hex_grid
 
@@ -639,6 +774,9 @@ class BinSensorOptimizer:
         self.config = config
         self.hex_grid = hex_grid
         self.n_categories = config.N_FOOTFALL_CATEGORIES
+        # The grid is fixed for this optimizer; prepare its cells once so the
+        # point-in-cell checks reuse their spatial indexes
+        shapely.prepare(hex_grid.geometry.values)
     
     def load_bin_locations(self, file_path: str) -> gpd.GeoDataFrame:
         """Load bin locations from file (CSV or GeoJSON)"""
@@ -655,11 +793,12 @@ class BinSensorOptimizer:
             if not lat_col or not lon_col:
                 raise ValueError("CSV must contain lat/latitude and lon/longitude columns")
             
-            geometry = [Point(xy) for xy in zip(df[lon_col], df[lat_col])]
-            gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
+            gdf = gpd.GeoDataFrame(
+                df, geometry=gpd.points_from_xy(df[lon_col], df[lat_col]), crs="EPSG:4326"
+            )
             
         elif path.suffix.lower() == '.geojson':
-            gdf = gpd.read_file(file_path)
+            gdf = gpd.read_file(file_path, engine=GEO_IO_ENGINE)
         else:
             raise ValueError("File must be .csv or .geojson")
         
@@ -670,21 +809,34 @@ class BinSensorOptimizer:
         """Assign each bin to its containing hexagon"""
         print("Assigning bins to hexagonal cells...")
         
-        # Spatial join bins to hexagons
-        bins_with_hex = gpd.sjoin(
-            bins, 
-            self.hex_grid[['h3_index', 'footfall_category', 'footfall_category_name', 
-                          'footfall_score', 'footfall_percentile', 'geometry']],
-            how='left',
-            predicate='within'
+        # Look up each bin's H3 cell directly instead of a spatial join, at
+        # the grid's own resolution in case it was built with another config
+        # (an empty grid has none, and every bin lands outside it anyway)
+        lonlat = shapely.get_coordinates(bins.geometry.values)
+        if len(self.hex_grid):
+            resolution = h3.h3_get_resolution(self.hex_grid['h3_index'].iloc[0])
+        else:
+            resolution = self.config.H3_RESOLUTION
+        bin_cells = [h3.geo_to_h3(lat, lon, resolution) for lon, lat in lonlat]
+        cell_idx = pd.Index(self.hex_grid['h3_index']).get_indexer(bin_cells)
+        
+        # Cells cut by the boundary only own the part inside it
+        assigned = cell_idx >= 0
+        assigned[assigned] = shapely.contains_xy(
+            self.hex_grid.geometry.values[cell_idx[assigned]],
+            lonlat[assigned, 0], lonlat[assigned, 1]
         )
         
         # Handle bins outside Westminster boundary
-        outside = bins_with_hex['h3_index'].isna().sum()
+        outside = (~assigned).sum()
         if outside > 0:
             print(f"  Warning: {outside} bins are outside Westminster boundary")
         
-        bins_with_hex = bins_with_hex.dropna(subset=['h3_index'])
+        bins_with_hex = bins[assigned].copy()
+        hex_attrs = self.hex_grid[['h3_index', 'footfall_category', 'footfall_category_name',
+                                   'footfall_score', 'footfall_percentile']]
+        for column, values in hex_attrs.iloc[cell_idx[assigned]].items():
+            bins_with_hex[column] = values.to_numpy()
         print(f"  {len(bins_with_hex)} bins assigned to hexagonal cells")
         
         return bins_with_hex
@@ -693,7 +845,7 @@ class BinSensorOptimizer:
         self,
         bins: gpd.GeoDataFrame,
         n_sensors: int = 1000,
-        min_distance_m: float = 50
+        min_distance_m: Optional[float] = None
     ) -> gpd.GeoDataFrame:
         """
         Select optimal bin locations for sensor placement.
@@ -701,7 +853,8 @@ class BinSensorOptimizer:
         Strategy:
         1. Distribute sensors proportionally across footfall categories
         2. Within each category, maximize spatial distribution
-        3. Ensure minimum distance between selected bins
+        3. Optionally (min_distance_m), keep every selected bin at least that
+           far from every other, filling categories from peak footfall down
         """
         print(f"\nOptimizing placement of {n_sensors} sensors...")
         
@@ -713,46 +866,52 @@ class BinSensorOptimizer:
         
         # Adjust to ensure minimum representation of each category
         min_per_category = max(20, n_sensors // (2 * self.n_categories))
-        target_distribution = (category_weights * n_sensors).astype(int)
-        target_distribution = np.maximum(target_distribution, min_per_category)
-        
-        # Scale to match total
-        while target_distribution.sum() > n_sensors:
-            max_idx = target_distribution.argmax()
-            target_distribution.iloc[max_idx] -= 1
-        while target_distribution.sum() < n_sensors:
-            min_idx = target_distribution.argmin()
-            target_distribution.iloc[min_idx] += 1
+        target_distribution = self._allocate_targets(category_weights, n_sensors, min_per_category)
         
         print("\n  Target distribution across footfall categories:")
         for cat in range(self.n_categories):
             if cat in target_distribution.index:
                 print(f"    Category {cat}: {target_distribution.loc[cat]} sensors")
         
-        # Select bins for each category
-        selected_bins = []
-        bins_proj = bins.to_crs("EPSG:27700")
+        # Select bins for each category, measuring distances in BNG meters
+        # while the bins themselves keep their original geometry
+        bins_xy = shapely.get_coordinates(bins.geometry.to_crs("EPSG:27700").values)
+        categories = bins['footfall_category'].to_numpy()
+        cat_rows = {
+            cat: np.flatnonzero(categories == cat)
+            for cat in range(self.n_categories) if cat in target_distribution.index
+        }
         
-        for cat in range(self.n_categories):
-            if cat not in target_distribution.index:
-                continue
-                
-            target = target_distribution.loc[cat]
-            cat_bins = bins_proj[bins_proj['footfall_category'] == cat].copy()
+        if min_distance_m is None:
+            def select_category(cat):
+                rows = cat_rows[cat]
+                target = target_distribution.loc[cat]
+                if len(rows) <= target:
+                    # Take all bins in this category
+                    return rows
+                # Use spatial sampling to maximize coverage
+                return rows[self._spatial_sampling(bins_xy[rows], target)]
             
-            if len(cat_bins) <= target:
-                # Take all bins in this category
-                selected_bins.append(cat_bins)
-                print(f"    Category {cat}: Selected all {len(cat_bins)} available bins")
+            # Categories are independent; the sampling kernels release the GIL
+            with ThreadPoolExecutor(max_workers=max(1, len(cat_rows))) as executor:
+                selected = dict(zip(cat_rows, executor.map(select_category, cat_rows)))
+        else:
+            selected = self._select_spaced(
+                bins_xy, cat_rows, target_distribution, min(n_sensors, len(bins)), min_distance_m
+            )
+        
+        for cat, rows in selected.items():
+            if len(rows) == len(cat_rows[cat]):
+                print(f"    Category {cat}: Selected all {len(rows)} available bins")
             else:
-                # Use spatial sampling to maximize coverage
-                cat_selected = self._spatial_sampling(cat_bins, target, min_distance_m)
-                selected_bins.append(cat_selected)
-                print(f"    Category {cat}: Selected {len(cat_selected)} bins")
+                print(f"    Category {cat}: Selected {len(rows)} bins")
+        selected_rows = list(selected.values())
         
-        # Combine selected bins
-        result = pd.concat(selected_bins, ignore_index=True)
-        result = gpd.GeoDataFrame(result, crs="EPSG:27700").to_crs("EPSG:4326")
+        # Combine selected bins with a single take of their row positions
+        all_rows = np.concatenate(selected_rows) if selected_rows else np.empty(0, dtype=np.intp)
+        result = bins.iloc[all_rows].reset_index(drop=True)
+        if not result.crs.equals("EPSG:4326"):
+            result = result.to_crs("EPSG:4326")
         
         # Add selection metadata
         result['selected_for_sensor'] = True
@@ -763,46 +922,140 @@ class BinSensorOptimizer:
         
         return result
     
+    @staticmethod
+    def _allocate_targets(
+        category_weights: pd.Series,
+        n_sensors: int,
+        min_per_category: int
+    ) -> pd.Series:
+        """
+        Split n_sensors across categories by largest remainder, with each
+        category raised to at least min_per_category. Any surplus from the
+        minimum is trimmed from the largest targets down to a common level.
+        """
+        raw = category_weights.to_numpy() * n_sensors
+        base = np.maximum(np.floor(raw).astype(int), min_per_category)
+        
+        deficit = n_sensors - base.sum()
+        if deficit > 0:
+            # Hand the remaining sensors to the largest fractional parts,
+            # found by partition (the deficit is always below the category
+            # count); ties at the cut-off go to the lowest index
+            frac = raw - np.floor(raw)
+            cutoff = np.partition(frac, len(frac) - deficit)[len(frac) - deficit]
+            above = np.flatnonzero(frac > cutoff)
+            at_cutoff = np.flatnonzero(frac == cutoff)[:deficit - len(above)]
+            base[above] += 1
+            base[at_cutoff] += 1
+        elif deficit < 0:
+            # Lowest level that still leaves at least n_sensors when capped
+            levels = np.arange(base.max() + 1)
+            capped_sums = np.minimum(base[None, :], levels[:, None]).sum(axis=1)
+            level = levels[capped_sums >= n_sensors][0]
+            base = np.minimum(base, level)
+            # Drop the leftover from the first targets sitting at that level
+            at_level = np.flatnonzero(base == level)
+            base[at_level[:base.sum() - n_sensors]] -= 1
+        
+        return pd.Series(base, index=category_weights.index)
+    
+    def _select_spaced(
+        self,
+        bins_xy: np.ndarray,
+        cat_rows: Dict[int, np.ndarray],
+        target_distribution: pd.Series,
+        n_wanted: int,
+        min_distance_m: float
+    ) -> Dict[int, np.ndarray]:
+        """
+        Per-category selection with a minimum distance across the whole
+        selection. Categories are filled from peak footfall down, each
+        skipping bins within min_distance_m of bins already chosen and
+        passing any shortfall on to the next; whatever still cannot be
+        placed is then filled, peak first, without the distance.
+        """
+        tree = cKDTree(bins_xy)
+        blocked = np.zeros(len(bins_xy), dtype=bool)
+        selected = {}
+        deficit = 0
+        for cat in sorted(cat_rows, reverse=True):
+            rows = cat_rows[cat][~blocked[cat_rows[cat]]]
+            target = min(target_distribution.loc[cat] + deficit, len(rows))
+            picks = rows[self._spatial_sampling(bins_xy[rows], target, min_distance_m)] if target else rows[:0]
+            deficit += target_distribution.loc[cat] - len(picks)
+            selected[cat] = picks
+            for near in tree.query_ball_point(bins_xy[picks], min_distance_m):
+                blocked[near] = True
+        
+        deficit = n_wanted - sum(len(rows) for rows in selected.values())
+        if deficit > 0:
+            print(f"  Warning: only {n_wanted - deficit} bins are at least {min_distance_m}m apart; "
+                  f"placing the remaining {deficit} without it")
+            # Top categories up to their targets first, then anything left over
+            for up_to_target in (True, False):
+                for cat in sorted(cat_rows, reverse=True):
+                    rest = np.setdiff1d(cat_rows[cat], selected[cat], assume_unique=True)
+                    n_extra = min(deficit, len(rest))
+                    if up_to_target:
+                        n_extra = min(n_extra, max(0, target_distribution.loc[cat] - len(selected[cat])))
+                    if n_extra:
+                        extra = rest[self._spatial_sampling(bins_xy[rest], n_extra)]
+                        selected[cat] = np.concatenate([selected[cat], extra])
+                        deficit -= n_extra
+        
+        return dict(sorted(selected.items()))
+    
     def _spatial_sampling(
         self,
-        bins: gpd.GeoDataFrame,
+        coords: np.ndarray,
         n_select: int,
-        min_distance: float
-    ) -> gpd.GeoDataFrame:
-        """Select bins using spatial sampling to maximize coverage"""
-        coords = np.array([(geom.x, geom.y) for geom in bins.geometry])
+        min_distance: float = 0
+    ) -> np.ndarray:
+        """
+        Select bins using spatial sampling to maximize coverage. Returns
+        positions into coords (in meters), in selection order. With a
+        min_distance, stops early once the farthest remaining bin is closer
+        than that to the selection, since every later pick would be closer still.
+        """
         
-        selected_indices = []
-        available_indices = list(range(len(bins)))
+        n_select = min(n_select, len(coords))
+        selected_indices = np.empty(n_select, dtype=np.intp)
         
         # Start with the bin closest to the centroid (central location)
         centroid = coords.mean(axis=0)
         distances_to_centroid = np.linalg.norm(coords - centroid, axis=1)
         first_idx = np.argmin(distances_to_centroid)
-        selected_indices.append(first_idx)
-        available_indices.remove(first_idx)
+        selected_indices[0] = first_idx
+        
+        min_distance_sq = float(min_distance) ** 2
+        if HAS_NUMBA:
+            n_found = _fps_kernel(coords, selected_indices, min_distance_sq)
+            return selected_indices[:n_found]
+        
+        # Squared distance from every bin to its nearest selected bin,
+        # updated with only the newly added bin on each pick
+        min_dist = np.sum((coords - coords[first_idx]) ** 2, axis=1)
+        min_dist[first_idx] = -1
+        tree = cKDTree(coords)
         
         # Iteratively select bins that maximize minimum distance to selected set
-        while len(selected_indices) < n_select and available_indices:
-            selected_coords = coords[selected_indices]
-            
-            best_idx = None
-            best_min_dist = -1
-            
-            for idx in available_indices:
-                # Calculate minimum distance to all selected bins
-                dists = np.linalg.norm(selected_coords - coords[idx], axis=1)
-                min_dist = dists.min()
-                
-                if min_dist > best_min_dist:
-                    best_min_dist = min_dist
-                    best_idx = idx
-            
-            if best_idx is not None:
-                selected_indices.append(best_idx)
-                available_indices.remove(best_idx)
+        n_found = n_select
+        for i in range(1, n_select):
+            best_idx = int(min_dist.argmax())
+            if min_dist[best_idx] < min_distance_sq:
+                n_found = i
+                break
+            selected_indices[i] = best_idx
+            # Only bins closer to the new pick than the current best distance
+            # can have their min-distance reduced
+            radius = np.sqrt(min_dist[best_idx]) * (1 + 1e-9)
+            nearby = np.asarray(tree.query_ball_point(coords[best_idx], radius), dtype=np.intp)
+            min_dist[nearby] = np.minimum(
+                min_dist[nearby], np.sum((coords[nearby] - coords[best_idx]) ** 2, axis=1)
+            )
+            min_dist[best_idx] = -1
         
-        return bins.iloc[selected_indices]
+        return selected_indices[:n_found]
     
     def _print_selection_summary(self, selected: gpd.GeoDataFrame):
         """Print summary of selected bin locations"""
@@ -814,6 +1067,40 @@ class BinSensorOptimizer:
                 print(f"    Category {cat}: {len(cat_selected)} bins (mean footfall: {mean_score:.3f})")
 
 
+if HAS_NUMBA:
+    @njit(cache=True, nogil=True)
+    def _fps_kernel(coords, selected, min_dist_sq):
+        """
+        Greedy farthest-point selection in place, seeded with selected[0].
+        Each pass updates the min-distance array and finds the next argmax
+        together; ties go to the lowest index like np.argmax. Returns the
+        number of picks made before the farthest bin fell below min_dist_sq.
+        """
+        n = coords.shape[0]
+        min_dist = np.full(n, np.inf)
+        last = selected[0]
+        for k in range(1, selected.shape[0]):
+            min_dist[last] = -1.0
+            lx = coords[last, 0]
+            ly = coords[last, 1]
+            best = -1
+            best_dist = -1.0
+            for i in range(n):
+                dx = coords[i, 0] - lx
+                dy = coords[i, 1] - ly
+                d = dx * dx + dy * dy
+                if d < min_dist[i]:
+                    min_dist[i] = d
+                if min_dist[i] > best_dist:
+                    best_dist = min_dist[i]
+                    best = i
+            if best_dist < min_dist_sq:
+                return k
+            selected[k] = best
+            last = best
+        return selected.shape[0]
+
+
 # =============================================================================
 # VISUALIZATION
 # =============================================================================
@@ -833,6 +1120,19 @@ class Visualizer:
             '#d73027',  # Red - very high
             '#a50026',  # Dark red - peak
         ]
+        self.colors_arr = np.array(self.colors, dtype=object)
+    
+    def _category_colors(self, categories: pd.Series) -> np.ndarray:
+        """Look up the fill color for each footfall category in one indexing step"""
+        return self.colors_arr[categories.to_numpy()]
+    
+    @staticmethod
+    def _map_center(hex_grid: gpd.GeoDataFrame) -> List[float]:
+        """Mean cell centroid as [lat, lon], from the cached columns when present"""
+        if '_centroid_lat' in hex_grid.columns:
+            return [hex_grid['_centroid_lat'].mean(), hex_grid['_centroid_lon'].mean()]
+        centroids = hex_grid.to_crs("EPSG:27700").geometry.centroid.to_crs("EPSG:4326")
+        return [centroids.y.mean(), centroids.x.mean()]
     
     def create_footfall_map(
         self,
@@ -845,33 +1145,36 @@ class Visualizer:
         print("Creating interactive footfall map...")
         
         # Center map on Westminster
-        center_lat = hex_grid.geometry.centroid.y.mean()
-        center_lon = hex_grid.geometry.centroid.x.mean()
-        
         m = folium.Map(
-            location=[center_lat, center_lon],
+            location=self._map_center(hex_grid),
             zoom_start=14,
             tiles='cartodbpositron'
         )
         
-        # Add hexagonal grid with footfall coloring
-        for idx, row in hex_grid.iterrows():
-            color = self.colors[int(row['footfall_category'])]
-            
-            folium.GeoJson(
-                row.geometry.__geo_interface__,
-                style_function=lambda x, color=color: {
-                    'fillColor': color,
-                    'color': color,
-                    'weight': 0.5,
-                    'fillOpacity': 0.6
-                },
-                tooltip=folium.Tooltip(
-                    f"Category: {row['footfall_category_name']}<br>"
-                    f"Footfall Score: {row['footfall_score']:.3f}<br>"
-                    f"Percentile: {row['footfall_percentile']:.1f}%"
-                )
-            ).add_to(m)
+        # Add hexagonal grid with footfall coloring as a single layer
+        hex_layer = gpd.GeoDataFrame(
+            {
+                'color': self._category_colors(hex_grid['footfall_category']),
+                'category': hex_grid['footfall_category_name'].astype(str),
+                'score': hex_grid['footfall_score'].map('{:.3f}'.format),
+                'percentile': hex_grid['footfall_percentile'].map('{:.1f}%'.format),
+            },
+            geometry=hex_grid.geometry,
+            crs=hex_grid.crs
+        )
+        folium.GeoJson(
+            hex_layer,
+            style_function=lambda feature: {
+                'fillColor': feature['properties']['color'],
+                'color': feature['properties']['color'],
+                'weight': 0.5,
+                'fillOpacity': 0.6
+            },
+            tooltip=folium.GeoJsonTooltip(
+                fields=['category', 'score', 'percentile'],
+                aliases=['Category:', 'Footfall Score:', 'Percentile:']
+            )
+        ).add_to(m)
         
         # Add tube stations
         if tube_stations is not None:
@@ -904,60 +1207,67 @@ class Visualizer:
         """Create map showing recommended sensor placements"""
         print("Creating sensor placement map...")
         
-        center_lat = hex_grid.geometry.centroid.y.mean()
-        center_lon = hex_grid.geometry.centroid.x.mean()
-        
         m = folium.Map(
-            location=[center_lat, center_lon],
+            location=self._map_center(hex_grid),
             zoom_start=14,
             tiles='cartodbpositron'
         )
         
-        # Add hexagonal grid (lighter)
-        for idx, row in hex_grid.iterrows():
-            color = self.colors[int(row['footfall_category'])]
-            
-            folium.GeoJson(
-                row.geometry.__geo_interface__,
-                style_function=lambda x, color=color: {
-                    'fillColor': color,
-                    'color': color,
-                    'weight': 0.3,
-                    'fillOpacity': 0.3
-                }
-            ).add_to(m)
+        # Add hexagonal grid (lighter) as a single layer
+        hex_layer = gpd.GeoDataFrame(
+            {'color': self._category_colors(hex_grid['footfall_category'])},
+            geometry=hex_grid.geometry,
+            crs=hex_grid.crs
+        )
+        folium.GeoJson(
+            hex_layer,
+            style_function=lambda feature: {
+                'fillColor': feature['properties']['color'],
+                'color': feature['properties']['color'],
+                'weight': 0.3,
+                'fillOpacity': 0.3
+            }
+        ).add_to(m)
         
         # Add all bins (if provided) as small gray markers
         if all_bins is not None:
-            for idx, row in all_bins.iterrows():
-                folium.CircleMarker(
-                    location=[row.geometry.y, row.geometry.x],
+            folium.GeoJson(
+                gpd.GeoDataFrame(geometry=all_bins.geometry, crs=all_bins.crs),
+                marker=folium.CircleMarker(
                     radius=2,
                     color='gray',
                     fill=True,
-                    fillOpacity=0.5
-                ).add_to(m)
+                    fill_opacity=0.5
+                )
+            ).add_to(m)
         
         # Add selected bins as larger colored markers
-        marker_cluster = MarkerCluster(name="Selected Bins").add_to(m)
-        
-        for idx, row in selected_bins.iterrows():
-            color = self.colors[int(row['footfall_category'])]
-            
-            folium.CircleMarker(
-                location=[row.geometry.y, row.geometry.x],
+        selected_layer = gpd.GeoDataFrame(
+            {
+                'color': self._category_colors(selected_bins['footfall_category']),
+                'rank': selected_bins['selection_rank'],
+                'category': selected_bins['footfall_category_name'].astype(str),
+                'score': selected_bins['footfall_score'].map('{:.3f}'.format),
+            },
+            geometry=selected_bins.geometry,
+            crs=selected_bins.crs
+        )
+        folium.GeoJson(
+            selected_layer,
+            name="Selected Bins",
+            marker=folium.CircleMarker(
                 radius=6,
                 color='black',
                 fill=True,
-                fillColor=color,
-                fillOpacity=0.9,
-                popup=folium.Popup(
-                    f"Rank: {row['selection_rank']}<br>"
-                    f"Category: {row['footfall_category_name']}<br>"
-                    f"Footfall Score: {row['footfall_score']:.3f}",
-                    max_width=200
-                )
-            ).add_to(m)
+                fill_opacity=0.9
+            ),
+            style_function=lambda feature: {'fillColor': feature['properties']['color']},
+            popup=folium.GeoJsonPopup(
+                fields=['rank', 'category', 'score'],
+                aliases=['Rank:', 'Category:', 'Footfall Score:'],
+                max_width=200
+            )
+        ).add_to(m)
         
         # Add legend
         legend_html = self._create_legend_html()
@@ -1011,6 +1321,10 @@ class Visualizer:
         print("Creating distribution charts...")
         
         fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+        n_categories = self.config.N_FOOTFALL_CATEGORIES
+        total_counts = np.bincount(
+            hex_grid['footfall_category'].to_numpy(np.int64), minlength=n_categories
+        )
         
         # 1. Footfall score distribution
         ax1 = axes[0, 0]
@@ -1024,13 +1338,12 @@ class Visualizer:
         
         # 2. Category distribution
         ax2 = axes[0, 1]
-        category_counts = hex_grid['footfall_category'].value_counts().sort_index()
-        bars = ax2.bar(range(len(category_counts)), category_counts.values, color=self.colors)
+        ax2.bar(range(n_categories), total_counts, color=self.colors[:n_categories])
         ax2.set_xlabel('Footfall Category')
         ax2.set_ylabel('Number of Hexagonal Cells')
         ax2.set_title('Cells per Footfall Category')
-        ax2.set_xticks(range(len(category_counts)))
-        ax2.set_xticklabels([f'Cat {i}' for i in range(len(category_counts))])
+        ax2.set_xticks(range(n_categories))
+        ax2.set_xticklabels([f'Cat {i}' for i in range(n_categories)])
         
         # 3. Component scores heatmap
         ax3 = axes[1, 0]
@@ -1046,21 +1359,22 @@ class Visualizer:
         # 4. Selected bins distribution (if provided)
         ax4 = axes[1, 1]
         if selected_bins is not None:
-            selected_counts = selected_bins['footfall_category'].value_counts().sort_index()
-            total_counts = hex_grid['footfall_category'].value_counts().sort_index()
+            selected_counts = np.bincount(
+                selected_bins['footfall_category'].to_numpy(np.int64), minlength=n_categories
+            )
             
-            x = np.arange(len(selected_counts))
+            x = np.arange(n_categories)
             width = 0.35
             
-            ax4.bar(x - width/2, total_counts.values / total_counts.values.max(), width, 
+            ax4.bar(x - width/2, total_counts / total_counts.max(), width, 
                    label='All Cells (normalized)', alpha=0.5, color='gray')
-            ax4.bar(x + width/2, selected_counts.values / selected_counts.values.max(), width,
+            ax4.bar(x + width/2, selected_counts / selected_counts.max(), width,
                    label='Selected Bins (normalized)', color='steelblue')
             ax4.set_xlabel('Footfall Category')
             ax4.set_ylabel('Normalized Count')
             ax4.set_title('Sensor Selection vs Cell Distribution')
             ax4.set_xticks(x)
-            ax4.set_xticklabels([f'Cat {i}' for i in range(len(selected_counts))])
+            ax4.set_xticklabels([f'Cat {i}' for i in range(n_categories)])
             ax4.legend()
         else:
             ax4.text(0.5, 0.5, 'Load bin locations to see\nsensor selection distribution',
@@ -1176,7 +1490,7 @@ class WestminsterFootfallAnalysis:
         self,
         bin_file_path: str,
         n_sensors: int = 1000,
-        min_distance_m: float = 50
+        min_distance_m: Optional[float] = None
     ) -> gpd.GeoDataFrame:
         """
         Load bin locations and optimize sensor placement.
@@ -1185,7 +1499,8 @@ class WestminsterFootfallAnalysis:
             bin_file_path: Path to CSV or GeoJSON file with bin locations
                           CSV should have columns: lat/latitude, lon/longitude
             n_sensors: Number of sensors to place (default 1000)
-            min_distance_m: Minimum distance between selected bins in meters
+            min_distance_m: Optional minimum distance between any two selected
+                            bins in meters (default None: no spacing rule)
             
         Returns:
             GeoDataFrame with selected bin locations
@@ -1228,32 +1543,45 @@ class WestminsterFootfallAnalysis:
         
         # Save results
         output_file = self.config.OUTPUT_DIR / "recommended_sensor_locations.csv"
-        selected_bins_df = selected_bins.drop(columns=['geometry']).copy()
-        selected_bins_df['lat'] = selected_bins.geometry.y
-        selected_bins_df['lon'] = selected_bins.geometry.x
-        selected_bins_df.to_csv(output_file, index=False)
+        selected_bins.drop(columns=['geometry']).assign(
+            lat=selected_bins.geometry.y.values,
+            lon=selected_bins.geometry.x.values
+        ).to_csv(output_file, index=False)
         print(f"\nSaved recommended locations to: {output_file}")
         
         # GeoJSON output
         geojson_file = self.config.OUTPUT_DIR / "recommended_sensor_locations.geojson"
-        selected_bins.to_file(geojson_file, driver='GeoJSON')
+        self._write_geojson(selected_bins, geojson_file)
         print(f"Saved GeoJSON to: {geojson_file}")
         
         return selected_bins
     
+    @staticmethod
+    def _write_geojson(gdf: gpd.GeoDataFrame, path: Path):
+        """
+        Write a GeoDataFrame as GeoJSON. pyogrio writes through OGR in bulk;
+        without it, serialize in one pass with to_json() rather than going
+        through Fiona's per-feature schema handling.
+        """
+        if HAS_PYOGRIO:
+            gdf.to_file(path, driver='GeoJSON', engine=GEO_IO_ENGINE)
+        else:
+            Path(path).write_text(gdf.to_json(drop_id=True))
+    
     def _save_results(self):
         """Save analysis results to files"""
         # Save hex grid as GeoJSON
         hex_file = self.config.OUTPUT_DIR / "westminster_footfall_hexgrid.geojson"
-        self.hex_grid.to_file(hex_file, driver='GeoJSON')
+        centroid_columns = ['_centroid_lat', '_centroid_lon', '_centroid_x', '_centroid_y']
+        self._write_geojson(self.hex_grid.drop(columns=centroid_columns), hex_file)
         print(f"  Saved hexagonal grid to: {hex_file}")
         
         # Save as CSV (without geometry)
         csv_file = self.config.OUTPUT_DIR / "westminster_footfall_data.csv"
-        hex_df = self.hex_grid.drop(columns=['geometry']).copy()
-        hex_df['center_lat'] = self.hex_grid.geometry.centroid.y
-        hex_df['center_lon'] = self.hex_grid.geometry.centroid.x
-        hex_df.to_csv(csv_file, index=False)
+        self.hex_grid.drop(columns=['geometry'] + centroid_columns).assign(
+            center_lat=self.hex_grid['_centroid_lat'].values,
+            center_lon=self.hex_grid['_centroid_lon'].values
+        ).to_csv(csv_file, index=False)
         print(f"  Saved footfall data to: {csv_file}")
         
         # Save summary statistics
@@ -1290,15 +1618,15 @@ def generate_sample_bins(n_bins: int = 3000, output_path: str = "data/sample_bin
     """Generate sample bin locations for testing"""
     print(f"Generating {n_bins} sample bin locations...")
     
-    np.random.seed(44)
+    rng = np.random.default_rng(44)
     
     # Westminster bounds
     min_lon, max_lon = -0.20, -0.11
     min_lat, max_lat = 51.485, 51.535
     
     # Generate random points within bounds
-    lats = np.random.uniform(min_lat, max_lat, n_bins)
-    lons = np.random.uniform(min_lon, max_lon, n_bins)
+    lats = rng.uniform(min_lat, max_lat, n_bins)
+    lons = rng.uniform(min_lon, max_lon, n_bins)
     
     # Add some clustering around high footfall areas
     hotspots = [
@@ -1308,18 +1636,18 @@ def generate_sample_bins(n_bins: int = 3000, output_path: str = "data/sample_bin
         (51.5136, -0.1340, 0.003),  # Soho
     ]
     
+    # First third of the bins cycle through the hotspots
     n_clustered = n_bins // 3
-    for i in range(n_clustered):
-        hotspot = hotspots[i % len(hotspots)]
-        lats[i] = hotspot[0] + np.random.normal(0, hotspot[2])
-        lons[i] = hotspot[1] + np.random.normal(0, hotspot[2])
+    hot = np.array(hotspots)[np.arange(n_clustered) % len(hotspots)]
+    lats[:n_clustered] = hot[:, 0] + rng.normal(0, hot[:, 2])
+    lons[:n_clustered] = hot[:, 1] + rng.normal(0, hot[:, 2])
     
     df = pd.DataFrame({
         'bin_id': [f'BIN{i:05d}' for i in range(n_bins)],
         'lat': lats,
         'lon': lons,
-        'bin_type': np.random.choice(['General Waste', 'Recycling', 'Food Waste'], n_bins),
-        'capacity_liters': np.random.choice([120, 240, 360, 1100], n_bins)
+        'bin_type': rng.choice(['General Waste', 'Recycling', 'Food Waste'], n_bins),
+        'capacity_liters': rng.choice([120, 240, 360, 1100], n_bins)
     })
     
     Path(output_path).parent.mkdir(exist_ok=True)
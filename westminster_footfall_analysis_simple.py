@@ -16,9 +16,15 @@ This simplified version:
 
 import json
 import math
+import os
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 import csv
 
 # Try to import optional dependencies
@@ -36,6 +42,18 @@ except ImportError:
     HAS_PANDAS = False
     print("Note: pandas not available. Using pure Python data structures")
 
+try:
+    from numba import njit, prange
+    HAS_NUMBA = HAS_NUMPY
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = HAS_NUMPY
+except ImportError:
+    HAS_SCIPY = False
+
 
 # =============================================================================
 # CONFIGURATION
@@ -68,13 +86,35 @@ class Config:
     
     # Output directory
     OUTPUT_DIR: str = "output"
+    
+    def projection_scale(self) -> Tuple[float, float]:
+        """
+        (kx, ky) metres per degree of longitude and latitude at the bbox
+        centre: the one local east-north frame every metric step shares
+        """
+        return metres_per_degree((self.MIN_LAT + self.MAX_LAT) / 2)
+
+
+# Equirectangular scale factors: metres per degree of latitude, and of
+# longitude at the equator (scaled by cos(latitude) elsewhere)
+METRES_PER_DEG_LAT = 110540.0
+METRES_PER_DEG_LON = 111320.0
+
+
+def metres_per_degree(ref_lat: float) -> Tuple[float, float]:
+    """(kx, ky) metres per degree of longitude and latitude around ref_lat"""
+    return METRES_PER_DEG_LON * math.cos(math.radians(ref_lat)), METRES_PER_DEG_LAT
 
 
 # =============================================================================
 # DATA STRUCTURES
 # =============================================================================
 
-@dataclass
+# Records are slotted: no per-instance __dict__, so the thousands of cells,
+# bins and POIs stay compact and attribute access in the scoring loops is a
+# fixed offset rather than a dict lookup.
+
+@dataclass(slots=True)
 class Point:
     lat: float
     lon: float
@@ -82,9 +122,15 @@ class Point:
     def distance_to(self, other: 'Point') -> float:
         """Calculate approximate distance in degrees"""
         return math.sqrt((self.lat - other.lat)**2 + (self.lon - other.lon)**2)
+    
+    def distance_sq_to(self, other: 'Point') -> float:
+        """Squared distance in degrees, for comparing against a squared radius"""
+        dlat = self.lat - other.lat
+        dlon = self.lon - other.lon
+        return dlat * dlat + dlon * dlon
 
 
-@dataclass
+@dataclass(slots=True)
 class TubeStation:
     name: str
     lat: float
@@ -92,7 +138,7 @@ class TubeStation:
     annual_usage: float  # millions
 
 
-@dataclass 
+@dataclass(slots=True)
 class BusStop:
     stop_id: str
     lat: float
@@ -100,7 +146,7 @@ class BusStop:
     frequency: int  # buses per hour
 
 
-@dataclass
+@dataclass(slots=True)
 class LicensedPremises:
     premises_id: str
     area: str
@@ -110,7 +156,7 @@ class LicensedPremises:
     capacity: int
 
 
-@dataclass
+@dataclass(slots=True)
 class GridCell:
     cell_id: str
     center_lat: float
@@ -128,7 +174,7 @@ class GridCell:
     estimated_bin_fill_rate: float = 0.0  # Percentage per day
 
 
-@dataclass
+@dataclass(slots=True)
 class BinLocation:
     bin_id: str
     lat: float
@@ -146,6 +192,46 @@ class BinLocation:
     estimated_bin_fill_rate: float = 0.0
 
 
+@dataclass
+class CellArrays:
+    """Struct-of-arrays view of a cell list, used by the NumPy scoring path"""
+    lat: 'np.ndarray'
+    lon: 'np.ndarray'
+    tube_score: 'np.ndarray'
+    bus_score: 'np.ndarray'
+    premises_score: 'np.ndarray'
+    footfall_score: 'np.ndarray'
+    
+    @classmethod
+    def from_cells(cls, cells: List[GridCell]) -> 'CellArrays':
+        columns = [
+            [c.center_lat for c in cells], [c.center_lon for c in cells],
+            [c.tube_score for c in cells], [c.bus_score for c in cells],
+            [c.premises_score for c in cells], [c.footfall_score for c in cells],
+        ]
+        return cls(*(np.array(col, dtype=float) for col in columns))
+    
+    def write_back(self, cells: List[GridCell]):
+        """Copy the score arrays onto the GridCell objects"""
+        for cell, tube, bus, prem, footfall in zip(
+            cells, self.tube_score.tolist(), self.bus_score.tolist(),
+            self.premises_score.tolist(), self.footfall_score.tolist()
+        ):
+            cell.tube_score = tube
+            cell.bus_score = bus
+            cell.premises_score = prem
+            cell.footfall_score = footfall
+
+
+def poi_arrays(pois: list, weight_attr: str) -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+    """(lat, lon, weight) float64 arrays for a list of POI records"""
+    return (
+        np.array([p.lat for p in pois], dtype=float),
+        np.array([p.lon for p in pois], dtype=float),
+        np.array([getattr(p, weight_attr) for p in pois], dtype=float),
+    )
+
+
 # =============================================================================
 # DATA LOADING
 # =============================================================================
@@ -192,7 +278,10 @@ def load_tube_stations() -> List[TubeStation]:
 def load_bus_stops(config: Config) -> List[BusStop]:
     """Generate representative bus stops"""
     import random
-    random.seed(42)
+    # One local stream for every install (with or without NumPy), so the
+    # generated stops never depend on the environment; concurrent loaders
+    # do not interleave draws
+    rng = random.Random(42)
     
     # Major corridors with high frequency
     corridors = [
@@ -219,9 +308,9 @@ def load_bus_stops(config: Config) -> List[BusStop]:
                 lon = coord2[0] + (coord2[1] - coord2[0]) * i / 7
                 bus_stops.append(BusStop(
                     f"BS{stop_id:04d}",
-                    lat + random.uniform(-0.001, 0.001),
+                    lat + rng.uniform(-0.001, 0.001),
                     lon,
-                    freq + random.randint(-5, 5)
+                    freq + rng.randint(-5, 5)
                 ))
                 stop_id += 1
         else:
@@ -231,19 +320,19 @@ def load_bus_stops(config: Config) -> List[BusStop]:
                 bus_stops.append(BusStop(
                     f"BS{stop_id:04d}",
                     lat,
-                    lon + random.uniform(-0.001, 0.001),
-                    freq + random.randint(-5, 5)
+                    lon + rng.uniform(-0.001, 0.001),
+                    freq + rng.randint(-5, 5)
                 ))
                 stop_id += 1
     
     # Additional random stops
     for _ in range(150):
-        lat = random.uniform(config.MIN_LAT + 0.01, config.MAX_LAT - 0.01)
-        lon = random.uniform(config.MIN_LON + 0.01, config.MAX_LON - 0.01)
+        lat = rng.uniform(config.MIN_LAT + 0.01, config.MAX_LAT - 0.01)
+        lon = rng.uniform(config.MIN_LON + 0.01, config.MAX_LON - 0.01)
         bus_stops.append(BusStop(
             f"BS{stop_id:04d}",
             lat, lon,
-            random.randint(5, 25)
+            rng.randint(5, 25)
         ))
         stop_id += 1
     
@@ -253,7 +342,7 @@ def load_bus_stops(config: Config) -> List[BusStop]:
 def load_licensed_premises() -> List[LicensedPremises]:
     """Generate representative licensed premises"""
     import random
-    random.seed(43)
+    rng = random.Random(43)
     
     hotspots = [
         ("Soho", 51.5136, -0.1340, 0.008, 150),
@@ -284,16 +373,20 @@ def load_licensed_premises() -> List[LicensedPremises]:
         'Hotel Bar': (30, 100)
     }
     
+    # Local aliases skip the module attribute lookups in the per-premises loop
+    sqrt, cos, sin = math.sqrt, math.cos, math.sin
+    two_pi = 2 * math.pi
+    
     for name, center_lat, center_lon, radius, n_premises in hotspots:
         for _ in range(n_premises):
-            angle = random.uniform(0, 2 * math.pi)
-            r = radius * math.sqrt(random.random())
-            lat = center_lat + r * math.cos(angle)
-            lon = center_lon + r * math.sin(angle)
+            angle = rng.uniform(0, two_pi)
+            r = radius * sqrt(rng.random())
+            lat = center_lat + r * cos(angle)
+            lon = center_lon + r * sin(angle)
             
-            ptype = random.choices(types, weights=type_probs)[0]
+            ptype = rng.choices(types, weights=type_probs)[0]
             cap_range = capacities[ptype]
-            capacity = random.randint(cap_range[0], cap_range[1])
+            capacity = rng.randint(cap_range[0], cap_range[1])
             
             premises.append(LicensedPremises(
                 f"LP{premises_id:05d}",
@@ -432,45 +525,93 @@ WARD_ROADS = {
 }
 
 
+def _ward_meta(name: str, boundary: List[Tuple[float, float]]) -> tuple:
+    """(name, boundary, minx, maxx, miny, maxy, cx, cy) for one ward"""
+    xs = [p[0] for p in boundary]
+    ys = [p[1] for p in boundary]
+    cx = sum(xs[:-1]) / (len(boundary) - 1)
+    cy = sum(ys[:-1]) / (len(boundary) - 1)
+    return (name, boundary, min(xs), max(xs), min(ys), max(ys), cx, cy)
+
+
+# Ward bounding boxes and vertex centroids, computed once at import
+WARD_META = [_ward_meta(name, boundary) for name, boundary in WESTMINSTER_WARDS.items()]
+
+
 def get_ward_for_location(lon: float, lat: float) -> str:
     """Determine which ward a location belongs to"""
-    # First, try exact polygon match
-    for ward_name, boundary in WESTMINSTER_WARDS.items():
-        if point_in_polygon(lon, lat, boundary):
+    # First, try exact polygon match, skipping wards whose bbox misses the point
+    for ward_name, boundary, minx, maxx, miny, maxy, _, _ in WARD_META:
+        if minx <= lon <= maxx and miny <= lat <= maxy and point_in_polygon(lon, lat, boundary):
             return ward_name
     
-    # If no exact match, find nearest ward by centroid
-    min_dist = float('inf')
+    # If no exact match, find nearest ward by the precomputed centroids
+    min_dist_sq = float('inf')
     nearest_ward = "West End"  # Default to central ward
     
-    for ward_name, boundary in WESTMINSTER_WARDS.items():
-        # Calculate centroid of ward
-        cx = sum(p[0] for p in boundary[:-1]) / (len(boundary) - 1)
-        cy = sum(p[1] for p in boundary[:-1]) / (len(boundary) - 1)
-        dist = math.sqrt((lon - cx)**2 + (lat - cy)**2)
-        if dist < min_dist:
-            min_dist = dist
+    for ward_name, _, _, _, _, _, cx, cy in WARD_META:
+        dx = lon - cx
+        dy = lat - cy
+        dist_sq = dx * dx + dy * dy
+        if dist_sq < min_dist_sq:
+            min_dist_sq = dist_sq
             nearest_ward = ward_name
     
     return nearest_ward
 
 
+def get_ward_for_location_batch(lons: "np.ndarray", lats: "np.ndarray") -> List[str]:
+    """
+    Wards for many locations at once. Each ward's polygon is tested only
+    against the still-unassigned points inside its bbox, in WARD_META order,
+    and the leftovers take the nearest centroid, matching
+    get_ward_for_location point for point.
+    """
+    ward_idx = np.full(len(lons), -1, dtype=np.intp)
+    for k, (_, boundary, minx, maxx, miny, maxy, _, _) in enumerate(WARD_META):
+        todo = np.flatnonzero(ward_idx < 0)
+        x, y = lons[todo], lats[todo]
+        todo = todo[(minx <= x) & (x <= maxx) & (miny <= y) & (y <= maxy)]
+        if len(todo):
+            ward_idx[todo[point_in_polygon_batch(lons[todo], lats[todo], boundary)]] = k
+    
+    missing = np.flatnonzero(ward_idx < 0)
+    if len(missing):
+        centroids = np.array([meta[6:] for meta in WARD_META])
+        dx = lons[missing, None] - centroids[:, 0]
+        dy = lats[missing, None] - centroids[:, 1]
+        ward_idx[missing] = np.argmin(dx * dx + dy * dy, axis=1)
+    
+    names = [meta[0] for meta in WARD_META]
+    return [names[k] for k in ward_idx.tolist()]
+
+
 def get_road_for_cell(cell_lat: float, cell_lon: float, ward: str) -> str:
     """Assign a representative road name based on cell location within ward"""
-    import random
-    random.seed(int((cell_lat * 10000 + cell_lon * 10000) % 1000000))
-    
-    if ward in WARD_ROADS:
-        roads = WARD_ROADS[ward]
-        # Weight towards certain roads based on position
-        return random.choice(roads)
-    return "Unknown Road"
+    roads = WARD_ROADS.get(ward)
+    if not roads:
+        return "Unknown Road"
+    # Deterministic pick from the cell position, without reseeding the global
+    # RNG per cell. Grid keys share common factors (a 0.001 grid makes them
+    # all multiples of 10), so mix them Knuth-style before taking the modulus.
+    key = round(cell_lat * 10000) * 131 + round(cell_lon * 10000)
+    mixed = (key * 2654435761) & 0xFFFFFFFF
+    return roads[(mixed >> 16) % len(roads)]
 
 
 # =============================================================================
 # FOOTFALL ESTIMATION FORMULAS
 # =============================================================================
 
+# Base people per hour for each footfall category, lowest to highest
+CATEGORY_BASE_PEOPLE_PER_HOUR = [50, 150, 350, 700, 1200, 2000, 3500, 5000]
+
+# Bin fill assumptions shared by the scalar and array estimators
+WASTE_PER_PERSON_KG = 0.02
+WASTE_DENSITY_KG_PER_L = 0.1
+ACTIVE_HOURS_PER_DAY = 12
+
+
 def estimate_people_per_hour(footfall_score: float, footfall_category: int) -> float:
     """
     Convert footfall score to estimated people per hour.
@@ -481,8 +622,7 @@ def estimate_people_per_hour(footfall_score: float, footfall_category: int) -> f
     - Low footfall: ~50-300 people/hour
     """
     # Base estimation using category
-    category_bases = [50, 150, 350, 700, 1200, 2000, 3500, 5000]
-    base = category_bases[footfall_category]
+    base = CATEGORY_BASE_PEOPLE_PER_HOUR[footfall_category]
     
     # Adjust by score within category
     variation = base * 0.3 * (footfall_score * 2 - 0.5)
@@ -499,17 +639,27 @@ def estimate_bin_fill_rate(people_per_hour: float, bin_capacity: int = 240) -> f
     - Standard bin: 240L = 24kg capacity
     - Active hours: 12 hours/day
     """
-    waste_per_person = 0.02  # kg
-    waste_density = 0.1  # kg per liter
-    active_hours = 12
-    
-    daily_waste_kg = people_per_hour * active_hours * waste_per_person
-    daily_waste_liters = daily_waste_kg / waste_density
+    daily_waste_kg = people_per_hour * ACTIVE_HOURS_PER_DAY * WASTE_PER_PERSON_KG
+    daily_waste_liters = daily_waste_kg / WASTE_DENSITY_KG_PER_L
     
     fill_rate = (daily_waste_liters / bin_capacity) * 100
     return min(200, fill_rate)  # Cap at 200% (bins can overflow)
 
 
+def estimate_people_per_hour_array(footfall_scores: "np.ndarray", footfall_categories: "np.ndarray") -> "np.ndarray":
+    """Vectorized estimate_people_per_hour over score and category arrays"""
+    base = np.asarray(CATEGORY_BASE_PEOPLE_PER_HOUR, dtype=float)[footfall_categories]
+    variation = base * 0.3 * (footfall_scores * 2 - 0.5)
+    return np.maximum(10, base + variation)
+
+
+def estimate_bin_fill_rate_array(people_per_hour: "np.ndarray", bin_capacity: int = 240) -> "np.ndarray":
+    """Vectorized estimate_bin_fill_rate over an array of people-per-hour values"""
+    daily_waste_kg = people_per_hour * ACTIVE_HOURS_PER_DAY * WASTE_PER_PERSON_KG
+    daily_waste_liters = daily_waste_kg / WASTE_DENSITY_KG_PER_L
+    return np.minimum(200, (daily_waste_liters / bin_capacity) * 100)
+
+
 # =============================================================================
 # GRID GENERATION
 # =============================================================================
@@ -518,13 +668,26 @@ def create_grid(config: Config) -> List[GridCell]:
     """Create a regular grid covering Westminster"""
     print(f"Creating grid (resolution: {config.GRID_RESOLUTION} degrees)...")
     
+    # Index-based steps so centres don't drift with repeated float addition
+    res = config.GRID_RESOLUTION
+    n_lat = _grid_steps(config.MIN_LAT, config.MAX_LAT, res)
+    n_lon = _grid_steps(config.MIN_LON, config.MAX_LON, res)
+    
+    if HAS_NUMPY:
+        lats, lons = _westminster_raster(config.MIN_LAT, config.MIN_LON, n_lat, n_lon, res)
+        cells = [
+            GridCell(cell_id=f"CELL{cell_id:05d}", center_lat=lat, center_lon=lon)
+            for cell_id, (lat, lon) in enumerate(zip(lats, lons))
+        ]
+        print(f"  Created {len(cells)} grid cells")
+        return cells
+    
     cells = []
     cell_id = 0
-    
-    lat = config.MIN_LAT
-    while lat <= config.MAX_LAT:
-        lon = config.MIN_LON
-        while lon <= config.MAX_LON:
+    for i in range(n_lat):
+        lat = config.MIN_LAT + i * res
+        for j in range(n_lon):
+            lon = config.MIN_LON + j * res
             # Check if point is roughly within Westminster (simplified boundary)
             if is_in_westminster(lat, lon):
                 cells.append(GridCell(
@@ -533,13 +696,52 @@ def create_grid(config: Config) -> List[GridCell]:
                     center_lon=lon
                 ))
                 cell_id += 1
-            lon += config.GRID_RESOLUTION
-        lat += config.GRID_RESOLUTION
     
     print(f"  Created {len(cells)} grid cells")
     return cells
 
 
+@lru_cache(maxsize=8)
+def _westminster_raster(
+    min_lat: float, min_lon: float, n_lat: int, n_lon: int, res: float
+) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+    """
+    Centres of the grid points inside Westminster, from one batched polygon
+    test over the whole mesh. Cached per grid spec, so re-running the
+    analysis with the same config skips the containment test entirely.
+    """
+    grid_lat, grid_lon = np.meshgrid(
+        min_lat + np.arange(n_lat) * res,
+        min_lon + np.arange(n_lon) * res,
+        indexing='ij'
+    )
+    grid_lat = grid_lat.ravel()
+    grid_lon = grid_lon.ravel()
+    inside = is_in_westminster_batch(grid_lat, grid_lon)
+    return tuple(grid_lat[inside].tolist()), tuple(grid_lon[inside].tolist())
+
+
+# Simplified Westminster outline used for grid containment
+WESTMINSTER_BOUNDARY = [
+    (-0.1634, 51.5275),
+    (-0.1343, 51.5246),
+    (-0.1165, 51.5180),
+    (-0.1150, 51.5000),
+    (-0.1240, 51.4870),
+    (-0.1450, 51.4850),
+    (-0.1600, 51.4867),
+    (-0.1800, 51.5000),
+    (-0.2000, 51.5100),
+    (-0.1900, 51.5200),
+    (-0.1634, 51.5275),
+]
+
+
+def _grid_steps(lo: float, hi: float, res: float) -> int:
+    """Number of grid centres from lo up to hi (within half a step) at res spacing"""
+    return int(math.floor((hi - lo) / res + 0.5)) + 1
+
+
 def is_in_westminster(lat: float, lon: float) -> bool:
     """Check if point is approximately within Westminster boundary"""
     # Simplified Westminster polygon check
@@ -554,21 +756,13 @@ def is_in_westminster(lat: float, lon: float) -> bool:
         return False
     
     # Simple polygon containment for Westminster shape
-    westminster_boundary = [
-        (-0.1634, 51.5275),
-        (-0.1343, 51.5246),
-        (-0.1165, 51.5180),
-        (-0.1150, 51.5000),
-        (-0.1240, 51.4870),
-        (-0.1450, 51.4850),
-        (-0.1600, 51.4867),
-        (-0.1800, 51.5000),
-        (-0.2000, 51.5100),
-        (-0.1900, 51.5200),
-        (-0.1634, 51.5275),
-    ]
-    
-    return point_in_polygon(lon, lat, westminster_boundary)
+    return point_in_polygon(lon, lat, WESTMINSTER_BOUNDARY)
+
+
+def is_in_westminster_batch(lats: "np.ndarray", lons: "np.ndarray") -> "np.ndarray":
+    """Vectorized is_in_westminster over arrays of points"""
+    in_bounds = (lats >= 51.485) & (lats <= 51.535) & (lons >= -0.20) & (lons <= -0.11)
+    return in_bounds & point_in_polygon_batch(lons, lats, WESTMINSTER_BOUNDARY)
 
 
 def point_in_polygon(x: float, y: float, polygon: List[Tuple[float, float]]) -> bool:
@@ -588,6 +782,27 @@ def point_in_polygon(x: float, y: float, polygon: List[Tuple[float, float]]) ->
     return inside
 
 
+def point_in_polygon_batch(
+    xs: "np.ndarray", ys: "np.ndarray", polygon: List[Tuple[float, float]]
+) -> "np.ndarray":
+    """
+    Ray casting for many points at once: test every (point, edge) pair by
+    broadcasting and count crossings along the edge axis. Same edge order
+    and arithmetic as point_in_polygon, so results agree exactly.
+    """
+    poly = np.asarray(polygon, dtype=float)
+    xi, yi = poly[:, 0], poly[:, 1]
+    xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+    
+    y = ys[:, None]
+    straddles = (yi > y) != (yj > y)
+    # Horizontal edges never straddle; give them a dummy divisor
+    dy = np.where(yj == yi, 1.0, yj - yi)
+    x_cross = (xj - xi) * (y - yi) / dy + xi
+    crossings = (straddles & (xs[:, None] < x_cross)).sum(axis=1)
+    return (crossings & 1).astype(bool)
+
+
 # =============================================================================
 # FOOTFALL SCORING
 # =============================================================================
@@ -603,41 +818,73 @@ def calculate_footfall_scores(
     print("Calculating footfall scores...")
     
     # Calculate individual component scores
-    print("  - Tube station influence...")
-    max_tube = 0
-    for cell in cells:
-        for tube in tubes:
-            dist = Point(cell.center_lat, cell.center_lon).distance_to(
-                Point(tube.lat, tube.lon)
-            )
-            if dist < config.TUBE_INFLUENCE_RADIUS:
-                influence = tube.annual_usage * (1 - dist / config.TUBE_INFLUENCE_RADIUS) ** 2
-                cell.tube_score += influence
-        max_tube = max(max_tube, cell.tube_score)
+    if HAS_NUMPY:
+        arrays = CellArrays.from_cells(cells)
+        # One tree over the cell centres serves all three radii
+        cell_tree = (
+            cKDTree(np.column_stack([arrays.lat, arrays.lon]))
+            if HAS_SCIPY and not HAS_NUMBA and len(cells) else None
+        )
+        
+        layers = [
+            (*poi_arrays(tubes, 'annual_usage'), config.TUBE_INFLUENCE_RADIUS, 2),
+            (*poi_arrays(buses, 'frequency'), config.BUS_INFLUENCE_RADIUS, 1),
+            (*poi_arrays(premises, 'capacity'), config.PREMISES_INFLUENCE_RADIUS, 1),
+        ]
+        
+        if HAS_NUMBA:
+            print("  - Tube, bus and premises influence...")
+            tube, bus, prem = _fused_influence_scores(arrays.lat, arrays.lon, layers)
+            arrays.tube_score += tube
+            arrays.bus_score += bus
+            arrays.premises_score += prem
+        else:
+            for label, attr, (lat, lon, weights, radius, exponent) in zip(
+                ("Tube station", "Bus stop", "Licensed premises"),
+                ("tube_score", "bus_score", "premises_score"),
+                layers
+            ):
+                print(f"  - {label} influence...")
+                scores = getattr(arrays, attr)
+                scores += _influence_scores(
+                    arrays.lat, arrays.lon, lat, lon, weights, radius,
+                    exponent=exponent, cell_tree=cell_tree
+                )
+        
+        print("  - Calculating composite scores...")
+        
+        def normalized(scores):
+            max_score = scores.max(initial=0)
+            return scores / max_score if max_score > 0 else np.zeros_like(scores)
+        
+        arrays.footfall_score = (
+            config.TUBE_WEIGHT * normalized(arrays.tube_score) +
+            config.BUS_WEIGHT * normalized(arrays.bus_score) +
+            config.PREMISES_WEIGHT * normalized(arrays.premises_score)
+        )
+        arrays.write_back(cells)
+        return cells
     
+    # Pure-Python fallback
+    print("  - Tube station influence...")
+    _add_influence_bucketed(
+        cells, 'tube_score', tubes, [t.annual_usage for t in tubes],
+        config.TUBE_INFLUENCE_RADIUS, exponent=2
+    )
     print("  - Bus stop influence...")
-    max_bus = 0
-    for cell in cells:
-        for bus in buses:
-            dist = Point(cell.center_lat, cell.center_lon).distance_to(
-                Point(bus.lat, bus.lon)
-            )
-            if dist < config.BUS_INFLUENCE_RADIUS:
-                influence = bus.frequency * (1 - dist / config.BUS_INFLUENCE_RADIUS)
-                cell.bus_score += influence
-        max_bus = max(max_bus, cell.bus_score)
-    
+    _add_influence_bucketed(
+        cells, 'bus_score', buses, [b.frequency for b in buses],
+        config.BUS_INFLUENCE_RADIUS
+    )
     print("  - Licensed premises influence...")
-    max_premises = 0
-    for cell in cells:
-        for p in premises:
-            dist = Point(cell.center_lat, cell.center_lon).distance_to(
-                Point(p.lat, p.lon)
-            )
-            if dist < config.PREMISES_INFLUENCE_RADIUS:
-                influence = p.capacity * (1 - dist / config.PREMISES_INFLUENCE_RADIUS)
-                cell.premises_score += influence
-        max_premises = max(max_premises, cell.premises_score)
+    _add_influence_bucketed(
+        cells, 'premises_score', premises, [p.capacity for p in premises],
+        config.PREMISES_INFLUENCE_RADIUS
+    )
+    
+    max_tube = max((c.tube_score for c in cells), default=0)
+    max_bus = max((c.bus_score for c in cells), default=0)
+    max_premises = max((c.premises_score for c in cells), default=0)
     
     # Normalize and calculate composite score
     print("  - Calculating composite scores...")
@@ -655,14 +902,219 @@ def calculate_footfall_scores(
     return cells
 
 
+def _influence_scores(
+    cell_lat: "np.ndarray",
+    cell_lon: "np.ndarray",
+    poi_lat: "np.ndarray",
+    poi_lon: "np.ndarray",
+    weights: "np.ndarray",
+    radius: float,
+    exponent: int = 1,
+    cell_tree: Optional["cKDTree"] = None,
+    block_elements: int = 131072
+) -> "np.ndarray":
+    """
+    Sum weight * (1 - dist / radius) ** exponent over every POI within radius
+    of each cell. Uses the Numba kernel when available, then a radius query
+    on cell_tree (a cKDTree over the cell centres) when one is given, and
+    otherwise broadcasts cells against POIs a block of rows at a time. Blocks hold
+    about block_elements pairs so each temporary stays cache-sized
+    (~0.5 MB in float32) whatever the POI count.
+    
+    Scoring runs in float32. Coordinates are first taken as offsets from
+    the grid's mean centre in float64, so the narrowing keeps sub-metre
+    precision instead of rounding absolute latitudes near 51.5.
+    """
+    if cell_tree is not None and not HAS_NUMBA:
+        return _influence_scores_tree(
+            cell_tree, cell_lat, cell_lon, poi_lat, poi_lon, weights, radius, exponent
+        )
+    
+    origin = _grid_origin(cell_lat, cell_lon)
+    cell_lat, cell_lon = _offsets32(cell_lat, cell_lon, origin)
+    poi_lat, poi_lon = _offsets32(poi_lat, poi_lon, origin)
+    weights = np.asarray(weights, dtype=np.float32)
+    radius = np.float32(radius)
+    if HAS_NUMBA:
+        return _influence_kernel(cell_lat, cell_lon, poi_lat, poi_lon, weights, radius, exponent)
+    
+    scores = np.zeros(len(cell_lat), dtype=np.float32)
+    radius_sq = radius * radius
+    block_rows = max(16, block_elements // max(len(poi_lat), 1))
+    
+    for start in range(0, len(cell_lat), block_rows):
+        stop = start + block_rows
+        dlat = cell_lat[start:stop, None] - poi_lat[None, :]
+        dlon = cell_lon[start:stop, None] - poi_lon[None, :]
+        dist_sq = dlat * dlat
+        dist_sq += dlon * dlon
+        # Compare squared distances and take the root only for pairs in range
+        inside = dist_sq < radius_sq
+        falloff = np.zeros_like(dist_sq)
+        falloff[inside] = (1 - np.sqrt(dist_sq[inside]) / radius) ** exponent
+        scores[start:stop] = falloff @ weights
+    
+    return scores
+
+
+def _grid_origin(cell_lat: "np.ndarray", cell_lon: "np.ndarray") -> Tuple[float, float]:
+    """Mean cell centre, the origin for float32 coordinate offsets"""
+    if not len(cell_lat):
+        return 0.0, 0.0
+    return float(np.mean(cell_lat)), float(np.mean(cell_lon))
+
+
+def _offsets32(lat: "np.ndarray", lon: "np.ndarray", origin: Tuple[float, float]):
+    """Offsets from origin, taken in float64 and then narrowed to float32"""
+    return (
+        (np.asarray(lat, dtype=float) - origin[0]).astype(np.float32),
+        (np.asarray(lon, dtype=float) - origin[1]).astype(np.float32),
+    )
+
+
+def _fused_influence_scores(
+    cell_lat: "np.ndarray",
+    cell_lon: "np.ndarray",
+    layers: List[Tuple["np.ndarray", "np.ndarray", "np.ndarray", float, int]]
+) -> "np.ndarray":
+    """
+    Raw influence scores for several POI layers in one pass over the cells.
+    Each layer is (lat, lon, weights, radius, exponent); the POIs are packed
+    end to end with per-layer offsets so the Numba kernel visits every cell
+    once. Returns one float32 row per layer.
+    """
+    origin = _grid_origin(cell_lat, cell_lon)
+    cell_lat, cell_lon = _offsets32(cell_lat, cell_lon, origin)
+    poi_lat, poi_lon = _offsets32(
+        np.concatenate([layer[0] for layer in layers]),
+        np.concatenate([layer[1] for layer in layers]),
+        origin
+    )
+    weights = np.concatenate([layer[2] for layer in layers]).astype(np.float32)
+    starts = np.cumsum([0] + [len(layer[0]) for layer in layers]).astype(np.int64)
+    radii = np.array([layer[3] for layer in layers], dtype=np.float32)
+    exponents = np.array([layer[4] for layer in layers], dtype=np.int64)
+    return _fused_influence_kernel(
+        cell_lat, cell_lon, poi_lat, poi_lon, weights, starts, radii, exponents
+    )
+
+
+def _influence_scores_tree(
+    cell_tree: "cKDTree",
+    cell_lat: "np.ndarray",
+    cell_lon: "np.ndarray",
+    poi_lat: "np.ndarray",
+    poi_lon: "np.ndarray",
+    weights: "np.ndarray",
+    radius: float,
+    exponent: int = 1
+) -> "np.ndarray":
+    """Influence sums from the cells each POI's radius query returns"""
+    poi_lat = np.asarray(poi_lat, dtype=float)
+    poi_lon = np.asarray(poi_lon, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    
+    hits = cell_tree.query_ball_point(np.column_stack([poi_lat, poi_lon]), radius, workers=-1)
+    counts = np.fromiter((len(h) for h in hits), dtype=np.intp, count=len(hits))
+    if counts.sum() == 0:
+        return np.zeros(len(cell_lat), dtype=np.float32)
+    cell_idx = np.concatenate(hits).astype(np.intp)
+    poi_idx = np.repeat(np.arange(len(hits)), counts)
+    
+    # query_ball_point is inclusive at the radius; the falloff is zero there
+    dist = np.hypot(cell_lat[cell_idx] - poi_lat[poi_idx], cell_lon[cell_idx] - poi_lon[poi_idx])
+    influence = weights[poi_idx] * (1 - dist / radius) ** exponent
+    return np.bincount(cell_idx, weights=influence, minlength=len(cell_lat)).astype(np.float32)
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _influence_kernel(cell_lat, cell_lon, poi_lat, poi_lon, weights, radius, exponent):
+        """Per-cell influence sum over all POIs, parallel across cells"""
+        out = np.zeros(cell_lat.shape[0], dtype=np.float32)
+        radius_sq = radius * radius
+        one = np.float32(1.0)
+        for i in prange(cell_lat.shape[0]):
+            total = np.float32(0.0)
+            for j in range(poi_lat.shape[0]):
+                dlat = cell_lat[i] - poi_lat[j]
+                dlon = cell_lon[i] - poi_lon[j]
+                dist_sq = dlat * dlat + dlon * dlon
+                if dist_sq < radius_sq:
+                    total += weights[j] * (one - np.sqrt(dist_sq) / radius) ** exponent
+            out[i] = total
+        return out
+    
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _fused_influence_kernel(cell_lat, cell_lon, poi_lat, poi_lon, weights,
+                                starts, radii, exponents):
+        """Influence sums for every layer, one parallel pass over the cells"""
+        n_layers = radii.shape[0]
+        out = np.zeros((n_layers, cell_lat.shape[0]), dtype=np.float32)
+        one = np.float32(1.0)
+        for i in prange(cell_lat.shape[0]):
+            lat = cell_lat[i]
+            lon = cell_lon[i]
+            for layer in range(n_layers):
+                radius = radii[layer]
+                radius_sq = radius * radius
+                exponent = exponents[layer]
+                total = np.float32(0.0)
+                for j in range(starts[layer], starts[layer + 1]):
+                    dlat = lat - poi_lat[j]
+                    dlon = lon - poi_lon[j]
+                    dist_sq = dlat * dlat + dlon * dlon
+                    if dist_sq < radius_sq:
+                        total += weights[j] * (one - np.sqrt(dist_sq) / radius) ** exponent
+                out[layer, i] = total
+        return out
+
+
+def _add_influence_bucketed(
+    cells: List[GridCell],
+    score_attr: str,
+    pois: list,
+    weights: List[float],
+    radius: float,
+    exponent: int = 1
+):
+    """
+    Pure-Python influence pass: hash cells into buckets one radius wide so
+    each POI only tests cells in the 3x3 buckets around its own
+    """
+    floor = math.floor
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    for idx, cell in enumerate(cells):
+        key = (floor(cell.center_lat / radius), floor(cell.center_lon / radius))
+        buckets.setdefault(key, []).append(idx)
+    
+    # Hoist cell and POI attributes into locals once, outside the pair loop
+    cell_lats = [c.center_lat for c in cells]
+    cell_lons = [c.center_lon for c in cells]
+    scores = [getattr(c, score_attr) for c in cells]
+    radius_sq = radius * radius
+    sqrt = math.sqrt
+    neighbours = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+    
+    for poi_lat, poi_lon, weight in zip([p.lat for p in pois], [p.lon for p in pois], weights):
+        row = floor(poi_lat / radius)
+        col = floor(poi_lon / radius)
+        for dr, dc in neighbours:
+            for idx in buckets.get((row + dr, col + dc), ()):
+                dlat = cell_lats[idx] - poi_lat
+                dlon = cell_lons[idx] - poi_lon
+                dist_sq = dlat * dlat + dlon * dlon
+                if dist_sq < radius_sq:
+                    scores[idx] += weight * (1 - sqrt(dist_sq) / radius) ** exponent
+    
+    for cell, score in zip(cells, scores):
+        setattr(cell, score_attr, score)
+
+
 def categorize_cells(cells: List[GridCell], config: Config) -> List[GridCell]:
     """Assign footfall categories based on score distribution"""
     print(f"Categorizing cells into {config.N_FOOTFALL_CATEGORIES} categories...")
     
-    # Sort cells by footfall score
-    sorted_cells = sorted(cells, key=lambda c: c.footfall_score)
-    n = len(sorted_cells)
-    
     category_names = [
         "Very Low Footfall (Residential)",
         "Low Footfall",
@@ -674,29 +1126,59 @@ def categorize_cells(cells: List[GridCell], config: Config) -> List[GridCell]:
         "Peak Footfall (Commercial Core)"
     ]
     
-    # Assign categories based on percentile
-    for i, cell in enumerate(sorted_cells):
-        percentile = i / n
-        category = min(int(percentile * config.N_FOOTFALL_CATEGORIES), config.N_FOOTFALL_CATEGORIES - 1)
-        cell.footfall_category = category
-        cell.footfall_category_name = category_names[category]
-    
-    # Assign wards, roads, and estimate footfall metrics
+    # Assign categories based on percentile of the sorted scores
+    n = len(cells)
+    if HAS_NUMPY:
+        # Rank of each cell in score order, then exact integer percentile bins
+        scores = np.array([c.footfall_score for c in cells])
+        order = np.argsort(scores, kind='stable')
+        ranks = np.empty(n, dtype=np.int64)
+        ranks[order] = np.arange(n)
+        categories = np.minimum(
+            ranks * config.N_FOOTFALL_CATEGORIES // max(n, 1), config.N_FOOTFALL_CATEGORIES - 1
+        )
+        names = np.take(np.array(category_names, dtype=object), categories)
+        people = estimate_people_per_hour_array(scores, categories)
+        fill_rates = estimate_bin_fill_rate_array(people)
+        for cell, category, name, pph, fill in zip(
+            cells, categories.tolist(), names.tolist(), people.tolist(), fill_rates.tolist()
+        ):
+            cell.footfall_category = category
+            cell.footfall_category_name = name
+            cell.estimated_people_per_hour = pph
+            cell.estimated_bin_fill_rate = fill
+    else:
+        sorted_cells = sorted(cells, key=lambda c: c.footfall_score)
+        for i, cell in enumerate(sorted_cells):
+            category = min(i * config.N_FOOTFALL_CATEGORIES // n, config.N_FOOTFALL_CATEGORIES - 1)
+            cell.footfall_category = category
+            cell.footfall_category_name = category_names[category]
+    
+    # Assign wards, roads, and estimate footfall metrics (the NumPy path
+    # already filled in the estimates alongside the categories)
     print("  Assigning wards and estimating footfall metrics...")
-    for cell in cells:
+    if HAS_NUMPY:
+        wards = get_ward_for_location_batch(
+            np.array([c.center_lon for c in cells]), np.array([c.center_lat for c in cells])
+        )
+    else:
+        wards = [get_ward_for_location(c.center_lon, c.center_lat) for c in cells]
+    
+    for cell, ward in zip(cells, wards):
         # Assign ward
-        cell.ward = get_ward_for_location(cell.center_lon, cell.center_lat)
+        cell.ward = ward
         
         # Assign road name
         cell.road_name = get_road_for_cell(cell.center_lat, cell.center_lon, cell.ward)
         
-        # Estimate people per hour
-        cell.estimated_people_per_hour = estimate_people_per_hour(
-            cell.footfall_score, cell.footfall_category
-        )
-        
-        # Estimate bin fill rate
-        cell.estimated_bin_fill_rate = estimate_bin_fill_rate(cell.estimated_people_per_hour)
+        if not HAS_NUMPY:
+            # Estimate people per hour
+            cell.estimated_people_per_hour = estimate_people_per_hour(
+                cell.footfall_score, cell.footfall_category
+            )
+            
+            # Estimate bin fill rate
+            cell.estimated_bin_fill_rate = estimate_bin_fill_rate(cell.estimated_people_per_hour)
     
     # Print statistics
     category_counts = {}
@@ -727,20 +1209,31 @@ def load_bins_from_csv(file_path: str) -> List[BinLocation]:
     print(f"Loading bin locations from {file_path}...")
     
     bins = []
-    with open(file_path, 'r') as f:
-        reader = csv.DictReader(f)
+    with open(file_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        
+        # Resolve column positions once from the header rather than per row
+        lat_idx = next((i for i, k in enumerate(header) if k.lower() in ['lat', 'latitude']), None)
+        lon_idx = next((i for i, k in enumerate(header) if k.lower() in ['lon', 'longitude', 'lng']), None)
+        if lat_idx is None or lon_idx is None:
+            reader = iter(())
+        id_idx, type_idx, cap_idx = (
+            header.index(name) if name in header else None
+            for name in ('bin_id', 'bin_type', 'capacity_liters')
+        )
+        
         for row in reader:
-            lat_key = next((k for k in row.keys() if k.lower() in ['lat', 'latitude']), None)
-            lon_key = next((k for k in row.keys() if k.lower() in ['lon', 'longitude', 'lng']), None)
-            
-            if lat_key and lon_key:
-                bins.append(BinLocation(
-                    bin_id=row.get('bin_id', f"BIN{len(bins):05d}"),
-                    lat=float(row[lat_key]),
-                    lon=float(row[lon_key]),
-                    bin_type=row.get('bin_type', ''),
-                    capacity_liters=int(row.get('capacity_liters', 0)) if row.get('capacity_liters') else 0
-                ))
+            if not row:
+                continue
+            capacity = row[cap_idx] if cap_idx is not None else ''
+            bins.append(BinLocation(
+                bin_id=row[id_idx] if id_idx is not None else f"BIN{len(bins):05d}",
+                lat=float(row[lat_idx]),
+                lon=float(row[lon_idx]),
+                bin_type=row[type_idx] if type_idx is not None else '',
+                capacity_liters=int(capacity) if capacity else 0
+            ))
     
     print(f"  Loaded {len(bins)} bin locations")
     return bins
@@ -750,40 +1243,197 @@ def assign_bins_to_cells(bins: List[BinLocation], cells: List[GridCell], config:
     """Assign each bin to its nearest grid cell"""
     print("Assigning bins to grid cells...")
     
-    cell_dict = {(c.center_lat, c.center_lon): c for c in cells}
-    
+    # Distances in local metres (equirectangular), so nearest means nearest
+    # on the ground rather than in degrees; the cutoff is two grid steps
+    # north-south
+    kx, ky = config.projection_scale()
+    max_dist = config.GRID_RESOLUTION * 2 * ky
+    
+    # Cells sit on a regular lattice, so a bin's nearest lattice point is
+    # found by rounding in each axis (the metric is axis-aligned). When that
+    # point is a cell it is the nearest one; only bins whose point falls
+    # outside the outline need a search.
+    if HAS_NUMPY and cells and bins:
+        # Column arrays for the whole lookup; dataclasses are only touched
+        # to read coordinates and to copy the matched cell's fields
+        nearest_idx = _nearest_cell_indices(
+            np.fromiter((b.lat for b in bins), dtype=float, count=len(bins)),
+            np.fromiter((b.lon for b in bins), dtype=float, count=len(bins)),
+            np.fromiter((c.center_lat for c in cells), dtype=float, count=len(cells)),
+            np.fromiter((c.center_lon for c in cells), dtype=float, count=len(cells)),
+            config.GRID_RESOLUTION, kx, ky, max_dist
+        )
+        nearest = [cells[i] if i >= 0 else None for i in nearest_idx.tolist()]
+    else:
+        nearest = _nearest_cells_lattice(bins, cells, config.GRID_RESOLUTION)
+        misses = [k for k, cell in enumerate(nearest) if cell is None]
+        found = _nearest_cells_scalar([bins[k] for k in misses], cells, max_dist, kx, ky)
+        for k, cell in zip(misses, found):
+            nearest[k] = cell
+    
+    # Read the matched cell's fields in one C-level call per bin
+    cell_fields = attrgetter(
+        'cell_id', 'footfall_category', 'footfall_score', 'ward', 'road_name',
+        'estimated_people_per_hour', 'estimated_bin_fill_rate'
+    )
     assigned = 0
+    for bin_loc, nearest_cell in zip(bins, nearest):
+        if nearest_cell:
+            (bin_loc.cell_id, bin_loc.footfall_category, bin_loc.footfall_score,
+             bin_loc.ward, bin_loc.road_name, bin_loc.estimated_people_per_hour,
+             bin_loc.estimated_bin_fill_rate) = cell_fields(nearest_cell)
+            assigned += 1
+    
+    print(f"  Assigned {assigned} bins to grid cells")
+    return bins
+
+
+def _nearest_cell_indices(
+    bin_lat: "np.ndarray",
+    bin_lon: "np.ndarray",
+    cell_lat: "np.ndarray",
+    cell_lon: "np.ndarray",
+    res: float,
+    kx: float,
+    ky: float,
+    max_dist: float,
+    block_elements: int = 131072
+) -> "np.ndarray":
+    """
+    Index of the nearest cell within max_dist metres for each bin, or -1.
+    Cells are rasterised onto their lattice so most bins resolve by one
+    array lookup; the rest go to a cKDTree query when SciPy is available,
+    then the Numba scan, and a blocked brute-force argmin otherwise.
+    """
+    lat0, lon0 = cell_lat.min(), cell_lon.min()
+    rows = np.rint((cell_lat - lat0) / res).astype(np.intp)
+    cols = np.rint((cell_lon - lon0) / res).astype(np.intp)
+    raster = np.full((rows.max() + 1, cols.max() + 1), -1, dtype=np.intp)
+    raster[rows, cols] = np.arange(len(cell_lat))
+    
+    bin_rows = np.rint((bin_lat - lat0) / res)
+    bin_cols = np.rint((bin_lon - lon0) / res)
+    on_raster = (
+        (bin_rows >= 0) & (bin_rows < raster.shape[0]) &
+        (bin_cols >= 0) & (bin_cols < raster.shape[1])
+    )
+    nearest = np.full(len(bin_lat), -1, dtype=np.intp)
+    nearest[on_raster] = raster[
+        bin_rows[on_raster].astype(np.intp), bin_cols[on_raster].astype(np.intp)
+    ]
+    
+    misses = np.flatnonzero(nearest < 0)
+    if not len(misses):
+        return nearest
+    
+    cell_y, cell_x = cell_lat * ky, cell_lon * kx
+    miss_y, miss_x = bin_lat[misses] * ky, bin_lon[misses] * kx
+    if HAS_SCIPY:
+        # One tree over the projected cell centres; misses beyond max_dist come back as inf
+        tree = cKDTree(np.column_stack([cell_y, cell_x]))
+        dists, idxs = tree.query(
+            np.column_stack([miss_y, miss_x]), k=1, distance_upper_bound=max_dist
+        )
+        nearest[misses] = np.where(dists < max_dist, idxs, -1)
+        return nearest
+    if HAS_NUMBA:
+        nearest[misses] = _nearest_cell_kernel(miss_y, miss_x, cell_y, cell_x, max_dist * max_dist)
+        return nearest
+    
+    block_rows = max(16, block_elements // len(cell_lat))
+    for start in range(0, len(misses), block_rows):
+        stop = start + block_rows
+        dy = miss_y[start:stop, None] - cell_y[None, :]
+        dx = miss_x[start:stop, None] - cell_x[None, :]
+        dist_sq = dy * dy + dx * dx
+        best = dist_sq.argmin(axis=1)
+        in_range = dist_sq[np.arange(len(best)), best] < max_dist * max_dist
+        nearest[misses[start:stop]] = np.where(in_range, best, -1)
+    return nearest
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _nearest_cell_kernel(bin_y, bin_x, cell_y, cell_x, max_dist_sq):
+        """Nearest cell closer than sqrt(max_dist_sq) per bin, or -1; parallel across bins"""
+        out = np.empty(bin_y.shape[0], dtype=np.intp)
+        for i in prange(bin_y.shape[0]):
+            best = -1
+            best_dist_sq = max_dist_sq
+            for j in range(cell_y.shape[0]):
+                dy = bin_y[i] - cell_y[j]
+                dx = bin_x[i] - cell_x[j]
+                dist_sq = dy * dy + dx * dx
+                if dist_sq < best_dist_sq:
+                    best_dist_sq = dist_sq
+                    best = j
+            out[i] = best
+        return out
+
+
+def _nearest_cells_lattice(
+    bins: List[BinLocation], cells: List[GridCell], res: float
+) -> List[Optional[GridCell]]:
+    """The cell at each bin's nearest lattice point, or None if there is none"""
+    if not cells:
+        return [None] * len(bins)
+    lat0 = min(c.center_lat for c in cells)
+    lon0 = min(c.center_lon for c in cells)
+    lattice = {
+        (round((c.center_lat - lat0) / res), round((c.center_lon - lon0) / res)): c
+        for c in cells
+    }
+    return [
+        lattice.get((round((b.lat - lat0) / res), round((b.lon - lon0) / res)))
+        for b in bins
+    ]
+
+
+def _nearest_cells_scalar(
+    bins: List[BinLocation], cells: List[GridCell], max_dist: float, kx: float, ky: float
+) -> List[Optional[GridCell]]:
+    """
+    Nearest cell within max_dist metres for each bin. Cells are sorted by
+    projected latitude so each bin only scans the band within max_dist of
+    it north-south; ties go to the cell listed first, as in a full scan.
+    """
+    # Project cell centres once; the inner loop compares squared distances
+    # on plain floats instead of building two Points per (bin, cell) pair
+    centres = sorted(
+        (cell.center_lat * ky, idx, cell.center_lon * kx, cell)
+        for idx, cell in enumerate(cells)
+    )
+    band = [y for y, _, _, _ in centres]
+    max_dist_sq = max_dist * max_dist
+    
+    nearest = []
     for bin_loc in bins:
-        # Find nearest cell
-        min_dist = float('inf')
+        blat = bin_loc.lat * ky
+        blon = bin_loc.lon * kx
+        min_dist_sq = max_dist_sq
+        min_idx = -1  # No tie can displace "nothing yet": the cutoff is strict
         nearest_cell = None
         
-        for cell in cells:
-            dist = Point(bin_loc.lat, bin_loc.lon).distance_to(
-                Point(cell.center_lat, cell.center_lon)
-            )
-            if dist < min_dist:
-                min_dist = dist
+        lo = bisect_left(band, blat - max_dist)
+        hi = bisect_right(band, blat + max_dist)
+        for clat, idx, clon, cell in centres[lo:hi]:
+            dlat = blat - clat
+            dlon = blon - clon
+            dist_sq = dlat * dlat + dlon * dlon
+            if dist_sq < min_dist_sq or (dist_sq == min_dist_sq and idx < min_idx):
+                min_dist_sq = dist_sq
+                min_idx = idx
                 nearest_cell = cell
         
-        if nearest_cell and min_dist < config.GRID_RESOLUTION * 2:
-            bin_loc.cell_id = nearest_cell.cell_id
-            bin_loc.footfall_category = nearest_cell.footfall_category
-            bin_loc.footfall_score = nearest_cell.footfall_score
-            bin_loc.ward = nearest_cell.ward
-            bin_loc.road_name = nearest_cell.road_name
-            bin_loc.estimated_people_per_hour = nearest_cell.estimated_people_per_hour
-            bin_loc.estimated_bin_fill_rate = nearest_cell.estimated_bin_fill_rate
-            assigned += 1
-    
-    print(f"  Assigned {assigned} bins to grid cells")
-    return bins
+        nearest.append(nearest_cell)
+    return nearest
 
 
 def optimize_sensor_placement(
     bins: List[BinLocation],
     n_sensors: int = 1000,
-    n_categories: int = 8
+    n_categories: int = 8,
+    config: Optional[Config] = None
 ) -> List[BinLocation]:
     """Select optimal bin locations for sensor placement"""
     print(f"\nOptimizing placement of {n_sensors} sensors...")
@@ -798,53 +1448,32 @@ def optimize_sensor_placement(
             b.selection_rank = i + 1
         return assigned_bins
     
-    # Count bins per category
-    category_counts = {}
+    # Group bins by category once; counts and selection both read from it
+    category_bins = defaultdict(list)
     for b in assigned_bins:
-        cat = b.footfall_category
-        category_counts[cat] = category_counts.get(cat, 0) + 1
-    
-    # Calculate target distribution (sqrt-proportional for balanced coverage)
-    import math
-    total_sqrt = sum(math.sqrt(c) for c in category_counts.values())
-    target_per_category = {}
-    
-    for cat, count in category_counts.items():
-        target = int(n_sensors * math.sqrt(count) / total_sqrt)
-        target = max(target, min(20, count))  # At least 20 or all available
-        target_per_category[cat] = min(target, count)
+        category_bins[b.footfall_category].append(b)
+    category_counts = {cat: len(group) for cat, group in category_bins.items()}
     
-    # Adjust to match total
-    current_total = sum(target_per_category.values())
-    while current_total < n_sensors:
-        for cat in sorted(target_per_category.keys()):
-            if target_per_category[cat] < category_counts[cat]:
-                target_per_category[cat] += 1
-                current_total += 1
-                if current_total >= n_sensors:
-                    break
+    target_per_category = _category_targets(category_counts, n_sensors)
+    categories = sorted(target_per_category)
     
     print("\n  Target distribution by category:")
-    for cat in sorted(target_per_category.keys()):
+    for cat in categories:
         print(f"    Category {cat}: {target_per_category[cat]} sensors")
     
-    # Select bins with spatial diversity within each category
+    # Select bins with spatial diversity within each category, measuring
+    # distances in local metres
+    kx, ky = (config or Config()).projection_scale()
     selected = []
     rank = 1
     
-    for cat in sorted(target_per_category.keys()):
+    for cat in categories:
         target = target_per_category[cat]
-        cat_bins = [b for b in assigned_bins if b.footfall_category == cat]
+        cat_bins = category_bins[cat]
         
-        # Sort by location to spread them out spatially
-        cat_bins.sort(key=lambda b: (b.lat, b.lon))
-        
-        # Select evenly spaced bins
-        step = max(1, len(cat_bins) // target)
-        selected_indices = []
-        for i in range(0, len(cat_bins), step):
-            if len(selected_indices) < target:
-                selected_indices.append(i)
+        selected_indices = _farthest_point_sample(
+            [(b.lat * ky, b.lon * kx) for b in cat_bins], target
+        )
         
         for idx in selected_indices:
             cat_bins[idx].selected_for_sensor = True
@@ -856,21 +1485,160 @@ def optimize_sensor_placement(
     return selected
 
 
+def _category_targets(category_counts: Dict[int, int], n_sensors: int) -> Dict[int, int]:
+    """
+    Sqrt-proportional sensor targets per category (at least 20, or all bins
+    when fewer), capped at the category size. Any shortfall is handed out
+    one sensor per category per round, in category order, to categories
+    with bins to spare.
+    """
+    cats = sorted(category_counts)
+    
+    if HAS_NUMPY:
+        counts = np.array([category_counts[c] for c in cats])
+        targets = np.floor(n_sensors * np.sqrt(counts) / np.sqrt(counts).sum()).astype(int)
+        targets = np.minimum(np.maximum(targets, np.minimum(20, counts)), counts)
+        
+        deficit = n_sensors - targets.sum()
+        if deficit > 0:
+            # Whole rounds first: the most rounds whose top-ups fit the deficit
+            slack = counts - targets
+            levels = np.arange(slack.max() + 1)
+            filled = np.minimum(slack[None, :], levels[:, None]).sum(axis=1)
+            rounds = levels[filled <= deficit][-1]
+            targets += np.minimum(slack, rounds)
+            # Then the partial round, in category order
+            leftover = deficit - filled[rounds]
+            targets[np.flatnonzero(slack > rounds)[:leftover]] += 1
+        return dict(zip(cats, targets.tolist()))
+    
+    # Calculate target distribution (sqrt-proportional for balanced coverage)
+    total_sqrt = sum(math.sqrt(c) for c in category_counts.values())
+    target_per_category = {}
+    
+    for cat in cats:
+        count = category_counts[cat]
+        target = int(n_sensors * math.sqrt(count) / total_sqrt)
+        target = max(target, min(20, count))  # At least 20 or all available
+        target_per_category[cat] = min(target, count)
+    
+    # Adjust to match total: whole rounds first, found by walking the
+    # slacks upwards, then the partial round in category order
+    deficit = n_sensors - sum(target_per_category.values())
+    if deficit > 0:
+        slack = {cat: category_counts[cat] - target_per_category[cat] for cat in cats}
+        rounds = 0
+        filled = 0
+        remaining = len(cats)
+        for level in sorted(slack.values()):
+            # Rounds up to this level cost one sensor per category still open
+            step = min(level - rounds, (deficit - filled) // remaining) if remaining else 0
+            rounds += step
+            filled += step * remaining
+            if rounds < level:
+                break
+            remaining -= 1
+        for cat in cats:
+            target_per_category[cat] += min(slack[cat], rounds)
+        leftover = deficit - filled
+        for cat in cats:
+            if leftover and slack[cat] > rounds:
+                target_per_category[cat] += 1
+                leftover -= 1
+    
+    return target_per_category
+
+
+def _farthest_point_sample(coords: List[Tuple[float, float]], n_select: int) -> List[int]:
+    """
+    Greedy farthest-point sampling: start from the point nearest the
+    centroid, then repeatedly take the point farthest from everything
+    chosen so far. Returns positions into coords, in selection order.
+    """
+    n = len(coords)
+    n_select = min(n_select, n)
+    if n_select <= 0:
+        return []
+    
+    if HAS_NUMPY:
+        xy = np.asarray(coords, dtype=float)
+        first = int(np.argmin(np.sum((xy - xy.mean(axis=0)) ** 2, axis=1)))
+        # Squared distance from every point to its nearest selected point,
+        # updated with only the newly added point on each pick
+        min_dist = np.sum((xy - xy[first]) ** 2, axis=1)
+        min_dist[first] = -1
+        tree = cKDTree(xy) if HAS_SCIPY else None
+        
+        selected = [first]
+        for _ in range(1, n_select):
+            best = int(min_dist.argmax())
+            selected.append(best)
+            if tree is not None:
+                # Only points closer to the new pick than its own distance
+                # to the selection can have their min-distance reduced
+                radius = np.sqrt(min_dist[best]) * (1 + 1e-9)
+                nearby = np.asarray(tree.query_ball_point(xy[best], radius), dtype=np.intp)
+            else:
+                nearby = slice(None)
+            min_dist[nearby] = np.minimum(
+                min_dist[nearby], np.sum((xy[nearby] - xy[best]) ** 2, axis=1)
+            )
+            min_dist[best] = -1
+        return selected
+    
+    cx = sum(x for x, _ in coords) / n
+    cy = sum(y for _, y in coords) / n
+    first = min(range(n), key=lambda i: (coords[i][0] - cx) ** 2 + (coords[i][1] - cy) ** 2)
+    fx, fy = coords[first]
+    min_dist = [(x - fx) ** 2 + (y - fy) ** 2 for x, y in coords]
+    min_dist[first] = -1
+    
+    selected = [first]
+    for _ in range(1, n_select):
+        best = max(range(n), key=min_dist.__getitem__)
+        selected.append(best)
+        bx, by = coords[best]
+        for i, (x, y) in enumerate(coords):
+            d = (x - bx) ** 2 + (y - by) ** 2
+            if d < min_dist[i]:
+                min_dist[i] = d
+        min_dist[best] = -1
+    return selected
+
+
 # =============================================================================
 # OUTPUT GENERATION
 # =============================================================================
 
+# Outputs go out through a 1 MiB buffer so json.dump and csv.writer's many
+# small writes become few syscalls. They are reproducible analysis results,
+# so fsync on close is off unless FSYNC_OUTPUTS is set.
+OUTPUT_BUFFER_SIZE = 1 << 20
+FSYNC_OUTPUTS = False
+
+
+@contextmanager
+def _open_output(output_path: str, newline: Optional[str] = None):
+    """Open an output file for text writing with the shared buffering policy"""
+    with open(output_path, 'w', newline=newline, buffering=OUTPUT_BUFFER_SIZE) as f:
+        yield f
+        if FSYNC_OUTPUTS:
+            f.flush()
+            os.fsync(f.fileno())
+
+
 def save_grid_csv(cells: List[GridCell], output_path: str):
     """Save grid cells to CSV"""
     fieldnames = ['cell_id', 'center_lat', 'center_lon', 'tube_score', 'bus_score',
                   'premises_score', 'footfall_score', 'footfall_category', 'footfall_category_name',
                   'ward', 'road_name', 'locality', 'estimated_people_per_hour', 'estimated_bin_fill_rate']
     
-    with open(output_path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for cell in cells:
-            writer.writerow(asdict(cell))
+    # Rows straight from the slots as tuples; no per-row dict
+    row = attrgetter(*fieldnames)
+    with _open_output(output_path, newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(row(cell) for cell in cells)
     
     print(f"  Saved grid data to {output_path}")
 
@@ -883,107 +1651,91 @@ def save_selected_bins_csv(bins: List[BinLocation], output_path: str):
                   'cell_id', 'footfall_category', 'footfall_score', 'ward', 'road_name',
                   'estimated_people_per_hour', 'estimated_bin_fill_rate']
     
-    with open(output_path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for b in sorted(selected, key=lambda x: x.selection_rank):
-            writer.writerow({
-                'selection_rank': b.selection_rank,
-                'bin_id': b.bin_id,
-                'lat': b.lat,
-                'lon': b.lon,
-                'bin_type': b.bin_type,
-                'capacity_liters': b.capacity_liters,
-                'cell_id': b.cell_id,
-                'footfall_category': b.footfall_category,
-                'footfall_score': b.footfall_score,
-                'ward': b.ward,
-                'road_name': b.road_name,
-                'estimated_people_per_hour': b.estimated_people_per_hour,
-                'estimated_bin_fill_rate': b.estimated_bin_fill_rate
-            })
+    row = attrgetter(*fieldnames)
+    with _open_output(output_path, newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(row(b) for b in sorted(selected, key=lambda x: x.selection_rank))
     
     print(f"  Saved {len(selected)} recommended sensor locations to {output_path}")
 
 
 def save_geojson(cells: List[GridCell], output_path: str, config: Config):
-    """Save grid as GeoJSON for visualization"""
-    features = []
-    
+    """
+    Save grid as GeoJSON for visualization. Features are encoded and
+    written one at a time, so the collection is never held in memory.
+    """
     half_size = config.GRID_RESOLUTION / 2
-    
-    for cell in cells:
-        # Create square polygon for each cell
-        coords = [
-            [cell.center_lon - half_size, cell.center_lat - half_size],
-            [cell.center_lon + half_size, cell.center_lat - half_size],
-            [cell.center_lon + half_size, cell.center_lat + half_size],
-            [cell.center_lon - half_size, cell.center_lat + half_size],
-            [cell.center_lon - half_size, cell.center_lat - half_size],
-        ]
-        
-        feature = {
-            "type": "Feature",
-            "geometry": {
-                "type": "Polygon",
-                "coordinates": [coords]
-            },
-            "properties": {
-                "cell_id": cell.cell_id,
-                "footfall_score": round(cell.footfall_score, 4),
-                "footfall_category": cell.footfall_category,
-                "footfall_category_name": cell.footfall_category_name,
-                "tube_score": round(cell.tube_score, 2),
-                "bus_score": round(cell.bus_score, 2),
-                "premises_score": round(cell.premises_score, 2)
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    
+    with _open_output(output_path) as f:
+        f.write('{"type":"FeatureCollection","features":[')
+        for i, cell in enumerate(cells):
+            # Create square polygon for each cell
+            coords = [
+                [cell.center_lon - half_size, cell.center_lat - half_size],
+                [cell.center_lon + half_size, cell.center_lat - half_size],
+                [cell.center_lon + half_size, cell.center_lat + half_size],
+                [cell.center_lon - half_size, cell.center_lat + half_size],
+                [cell.center_lon - half_size, cell.center_lat - half_size],
+            ]
+            
+            feature = {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [coords]
+                },
+                "properties": {
+                    "cell_id": cell.cell_id,
+                    "footfall_score": round(cell.footfall_score, 4),
+                    "footfall_category": cell.footfall_category,
+                    "footfall_category_name": cell.footfall_category_name,
+                    "tube_score": round(cell.tube_score, 2),
+                    "bus_score": round(cell.bus_score, 2),
+                    "premises_score": round(cell.premises_score, 2)
+                }
             }
-        }
-        features.append(feature)
-    
-    geojson = {
-        "type": "FeatureCollection",
-        "features": features
-    }
-    
-    with open(output_path, 'w') as f:
-        json.dump(geojson, f)
+            if i:
+                f.write(',')
+            f.write(encode(feature))
+        f.write(']}')
     
     print(f"  Saved GeoJSON to {output_path}")
 
 
 def generate_sample_bins(n_bins: int = 3000, output_path: str = "data/sample_bins.csv"):
     """Generate sample bin locations for testing"""
-    import random
-    random.seed(44)
-    
     print(f"Generating {n_bins} sample bin locations...")
     
     Path(output_path).parent.mkdir(exist_ok=True)
     
-    bins = []
+    hotspots = [(51.5154, -0.1418), (51.4965, -0.1447), (51.5117, -0.1240)]
+    bin_types = ['General Waste', 'Recycling', 'Food Waste']
+    capacities = [120, 240, 360, 1100]
+    n_clustered = n_bins // 3
+    
+    import random
+    
+    # One stream for every install, so the sample file never depends on NumPy
+    rng = random.Random(44)
+    rows = []
     for i in range(n_bins):
-        lat = random.uniform(51.485, 51.535)
-        lon = random.uniform(-0.20, -0.11)
+        lat = rng.uniform(51.485, 51.535)
+        lon = rng.uniform(-0.20, -0.11)
         
         # Cluster some around high footfall areas
-        if i < n_bins // 3:
-            hotspots = [(51.5154, -0.1418), (51.4965, -0.1447), (51.5117, -0.1240)]
-            hotspot = random.choice(hotspots)
-            lat = hotspot[0] + random.gauss(0, 0.003)
-            lon = hotspot[1] + random.gauss(0, 0.003)
+        if i < n_clustered:
+            hotspot = rng.choice(hotspots)
+            lat = hotspot[0] + rng.gauss(0, 0.003)
+            lon = hotspot[1] + rng.gauss(0, 0.003)
         
-        bins.append({
-            'bin_id': f'BIN{i:05d}',
-            'lat': lat,
-            'lon': lon,
-            'bin_type': random.choice(['General Waste', 'Recycling', 'Food Waste']),
-            'capacity_liters': random.choice([120, 240, 360, 1100])
-        })
-    
-    with open(output_path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['bin_id', 'lat', 'lon', 'bin_type', 'capacity_liters'])
-        writer.writeheader()
-        writer.writerows(bins)
+        rows.append((f'BIN{i:05d}', lat, lon, rng.choice(bin_types), rng.choice(capacities)))
+    
+    with _open_output(output_path, newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['bin_id', 'lat', 'lon', 'bin_type', 'capacity_liters'])
+        writer.writerows(rows)
     
     print(f"  Saved to {output_path}")
     return output_path
@@ -1051,7 +1803,7 @@ def run_analysis(config: Config = None, bin_file: str = None, n_sensors: int = 1
         print("-" * 40)
         bins = load_bins_from_csv(bin_file)
         bins = assign_bins_to_cells(bins, cells, config)
-        selected = optimize_sensor_placement(bins, n_sensors, config.N_FOOTFALL_CATEGORIES)
+        selected = optimize_sensor_placement(bins, n_sensors, config.N_FOOTFALL_CATEGORIES, config)
         save_selected_bins_csv(bins, f"{config.OUTPUT_DIR}/recommended_sensor_locations.csv")
         print()
     